@@ -7,14 +7,144 @@ Connects to the server and sends commands:
   - start <program_name>    : Start an existing program.
   - stop <program_name>     : Stop a running program.
   - delete <program_name>   : Delete a program and its logs.
-  - getlog <program_name>   : Get logs for a program.
+  - getlog <program_name> [--since N] [--tail K]
+                            : Get logs for a program (runs from number N,
+                              only the last K).
+  - runs <program_name> [--since N] [--tail K]
+                            : List runs of a program with start time,
+                              exit code and output size.
   - programs                : List all programs with their status.
   - exit                    : Exit the client.
+
+The client switches the connection to the framed protocol if the server
+supports it and falls back to the END_OF_RESPONSE marker otherwise.
+Commands given with -c are sent together without waiting for responses.
 """
 
 import socket
+import struct
 import argparse
 
+END_OF_RESPONSE = b"'END_OF_RESPONSE'"
+# должны совпадать с server.py
+FRAMED_HELLO = "proto framed"
+FRAMED_ACCEPTED = b"OK framed\n"
+REQUEST_HEADER = struct.Struct(">II")
+RESPONSE_HEADER = struct.Struct(">IBI")
+FRAME_FINAL = 1
+
+
+def recv_exact(sock, size):
+    """
+    Reads exactly size bytes from the socket.
+
+    Returns:
+        bytes: The data, or None if the connection was closed earlier.
+    """
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            return None
+        received += count
+    return bytes(buf)
+
+
+def read_legacy_response(sock):
+    """
+    Reads one response of the legacy protocol.
+
+    Returns:
+        bytes: The response without the marker, or None if the server
+        closed the connection.
+    """
+    response = bytearray()
+    # маркер стоит в самом конце ответа — проверяем только хвост
+    while not response.endswith(END_OF_RESPONSE):
+        part = sock.recv(65536)
+        if len(part) == 0:
+            return None
+        response += part
+    return bytes(response[:-len(END_OF_RESPONSE)])
+
+
+class FramedConnection:
+    """
+    Connection in the framed protocol. Requests get increasing ids;
+    send() may be called several times before receive().
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.next_id = 1
+
+    def send(self, command):
+        """Sends a command and returns its request id."""
+        request_id = self.next_id
+        self.next_id += 1
+        payload = command.encode('utf-8')
+        self.sock.sendall(REQUEST_HEADER.pack(request_id, len(payload)) + payload)
+        return request_id
+
+    def receive(self):
+        """
+        Reads one whole response.
+
+        Returns:
+            tuple: (request id, response bytes), or None if the server
+            closed the connection.
+        """
+        chunks = []
+        while True:
+            header = recv_exact(self.sock, RESPONSE_HEADER.size)
+            if header is None:
+                return None
+            request_id, flags, length = RESPONSE_HEADER.unpack(header)
+            data = recv_exact(self.sock, length)
+            if data is None:
+                return None
+            chunks.append(data)
+            if flags & FRAME_FINAL:
+                return request_id, b"".join(chunks)
+
+
+def negotiate(sock):
+    """
+    Asks the server to switch to the framed protocol.
+
+    Returns:
+        FramedConnection, or None if the server only knows the legacy one.
+    """
+    sock.sendall(FRAMED_HELLO.encode('utf-8'))
+    response = read_legacy_response(sock)
+    if response is None:
+        raise ConnectionError("Server closed the connection")
+    if response == FRAMED_ACCEPTED:
+        return FramedConnection(sock)
+    return None
+
+
+def run_pipelined(framed, commands):
+    """
+    Sends all commands at once and prints the responses as they arrive.
+
+    Returns:
+        bool: False if the server closed the connection.
+    """
+    pending = {framed.send(command): command for command in commands}
+    while pending:
+        received = framed.receive()
+        if received is None:
+            print("Server closed the connection.")
+            return False
+        request_id, response = received
+        print(f"Server response to '{pending.pop(request_id)}':")
+        print(response.decode('utf-8', errors='replace'))
+    return True
+
+
 def main():
     """
     Parses command-line arguments, connects to the server,
@@ -25,26 +155,50 @@ def main():
                         help="Server IP (default: 127.0.0.1)")
     parser.add_argument('--port', type=int, default=54321,
                         help="Server port (default: 54321)")
+    parser.add_argument('--legacy', action='store_true',
+                        help="Do not negotiate the framed protocol")
+    parser.add_argument('-c', '--command', action='append', default=[],
+                        help="Send the command and exit; may be repeated, "
+                             "the commands are pipelined")
     args = parser.parse_args()
 
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
         client_socket.connect((args.host, args.port))
         print(f"Connected to server {args.host}:{args.port}")
+        framed = None if args.legacy else negotiate(client_socket)
     except Exception as e:
         print(f"Failed to connect to server: {e}")
+        client_socket.close()
         return
 
-    print("Available commands:")
-    print("  add <program_name>    - Create and start a program")
-    print("  start <program_name>  - Start a program if not running")
-    print("  stop <program_name>   - Stop a running program")
-    print("  delete <program_name> - Delete a program and its logs")
-    print("  getlog <program_name> - Get logs for the program")
-    print("  programs              - List all programs and their status")
-    print("  exit                  - Exit the client")
-
     try:
+        if args.command:
+            if framed is not None:
+                run_pipelined(framed, args.command)
+                return
+            for command in args.command:
+                client_socket.sendall(command.encode('utf-8'))
+                response = read_legacy_response(client_socket)
+                if response is None:
+                    print("Server closed the connection.")
+                    return
+                print(f"Server response to '{command}':")
+                print(response.decode('utf-8', errors='replace'))
+            return
+
+        print("Available commands:")
+        print("  add <program_name>    - Create and start a program")
+        print("  start <program_name>  - Start a program if not running")
+        print("  stop <program_name>   - Stop a running program")
+        print("  delete <program_name> - Delete a program and its logs")
+        print("  getlog <program_name> [--since N] [--tail K]")
+        print("                        - Get logs for the program (runs from N, last K)")
+        print("  runs <program_name> [--since N] [--tail K]")
+        print("                        - List runs: start time, exit code, output size")
+        print("  programs              - List all programs and their status")
+        print("  exit                  - Exit the client")
+
         while True:
             command = input("Enter command: ").strip()
             if not command:
@@ -53,19 +207,19 @@ def main():
                 print("Exiting client.")
                 break
             try:
-                client_socket.send(command.encode('utf-8'))
-                full_response = b""
-                while True:
-                    part = client_socket.recv(4096)
-                    if len(part) == 0:
-                        print("Server closed the connection.")
-                        return
-                    full_response += part
-                    if b"'END_OF_RESPONSE'" in full_response:
-                        break
+                if framed is not None:
+                    framed.send(command)
+                    received = framed.receive()
+                    response = received[1] if received is not None else None
+                else:
+                    client_socket.sendall(command.encode('utf-8'))
+                    response = read_legacy_response(client_socket)
+                if response is None:
+                    print("Server closed the connection.")
+                    return
 
                 print("Server response:")
-                print(full_response.decode('utf-8'))
+                print(response.decode('utf-8', errors='replace'))
             except Exception as e:
                 print(f"Error sending command: {e}")
                 break
@@ -74,7 +228,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
-
-if __name__ == '__main__':
-    main()
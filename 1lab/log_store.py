@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Append-only segmented log store for program runs.
+
+Every program has one store in its <program_name>_logs directory. The
+outputs of its runs are appended one after another to segment files:
+
+  <first_run>.seg  - outputs of runs first_run, first_run + 1, ...
+  <first_run>.idx  - one fixed-size RECORD per run of the segment:
+                     offset and length of the output in .seg, run start
+                     time and exit code.
+
+When a segment grows past segment_bytes the next run starts a new one,
+so the number of files grows with the total size of the logs, not with
+the number of runs. Runs are numbered from 0 for the life of the store.
+Run n is found by a binary search over the segments and a single read
+of its index record.
+
+compact() keeps the store bounded: whole old segments are dropped by a
+RetentionPolicy, and sealed segments (all but the last one) are
+compressed to <first_run>.seg.gz or, if the zstandard package is
+installed, <first_run>.seg.zst. Compressed segments stay readable
+through open_data(). With a policy the last segment is also sealed once
+it holds as many runs, bytes or seconds as the policy keeps, so small
+outputs do not pile up in one segment the policy can never drop. Runs
+outside the policy that still wait for compact() are not returned by
+runs().
+"""
+
+import os
+import gzip
+import time
+import bisect
+import shutil
+import threading
+from collections import namedtuple
+import struct
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен, без него сжимаем gzip
+    zstandard = None
+
+# смещение в .seg, длина вывода, время запуска, код возврата
+RECORD = struct.Struct(">QIdi")
+SEGMENT_BYTES = 8 * 1024 * 1024
+# код возврата неизвестен (запуск перенесён из старых log_<timestamp>.txt)
+EXIT_UNKNOWN = 0x7fffffff
+
+Run = namedtuple("Run", "number segment offset length timestamp exit_code")
+
+# расширение файла сегмента и функция открытия по алгоритму сжатия
+CODECS = {"gzip": (".gz", gzip.open)}
+if zstandard is not None:
+    CODECS["zstd"] = (".zst", zstandard.open)
+
+
+class RetentionPolicy:
+    """
+    Which runs to keep. A segment is dropped once all its runs are outside
+    the policy, so the store keeps at least the allowed runs and at most
+    one segment more.
+
+    Attributes:
+        max_runs (int): Keep the last max_runs runs.
+        max_bytes (int): Keep the newest runs taking max_bytes on disk.
+        max_age (float): Keep runs started less than max_age seconds ago.
+    """
+
+    def __init__(self, max_runs=None, max_bytes=None, max_age=None):
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def __bool__(self):
+        return any(limit is not None for limit in (self.max_runs, self.max_bytes, self.max_age))
+
+    def expired(self, newer_runs, newer_bytes, last_timestamp, now):
+        """
+        Whether a segment is outside the policy.
+
+        Args:
+            newer_runs (int): Runs stored after the segment.
+            newer_bytes (int): Disk bytes taken by the segments after it.
+            last_timestamp (float): Start time of its last run.
+            now (float): Current time.
+        """
+        return ((self.max_runs is not None and newer_runs >= self.max_runs)
+                or (self.max_bytes is not None and newer_bytes >= self.max_bytes)
+                or (self.max_age is not None and now - last_timestamp > self.max_age))
+
+    def segment_full(self, count, size, first_timestamp, now):
+        """
+        Whether the segment runs are appended to has to be sealed: only
+        sealed segments are dropped, so a segment may not outgrow what the
+        policy keeps.
+
+        Args:
+            count (int): Runs in the segment.
+            size (int): Output bytes in the segment.
+            first_timestamp (float): Start time of its first run.
+            now (float): Current time.
+        """
+        return ((self.max_runs is not None and count >= self.max_runs)
+                or (self.max_bytes is not None and size > self.max_bytes)
+                or (self.max_age is not None and now - first_timestamp > self.max_age))
+
+
+class Segment:
+    """
+    One segment of the store.
+
+    Attributes:
+        first_run (int): Number of the first run in the segment.
+        count (int): Number of runs in the segment.
+        size (int): Size of the uncompressed output in bytes.
+        codec (str): Compression of the data file, None if not compressed.
+        dropped (bool): Removed by retention.
+        first_timestamp (float): Start time of the first run, known for
+            the segment runs are appended to.
+    """
+
+    def __init__(self, directory, first_run):
+        self.first_run = first_run
+        self.base = os.path.join(directory, f"{first_run:010d}")
+        self.count = 0
+        self.size = 0
+        self.codec = None
+        self.dropped = False
+        self.first_timestamp = None
+
+    @property
+    def data_path(self):
+        return self.base + ".seg" + (CODECS[self.codec][0] if self.codec else "")
+
+    @property
+    def index_path(self):
+        return self.base + ".idx"
+
+
+class LogStore:
+    """
+    Segmented append-only store of run outputs of one program.
+
+    Safe to use from several threads: ProgramRunner appends while client
+    handlers read.
+    """
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES, retention=None):
+        """
+        Opens the store in directory, creating it if needed.
+
+        Args:
+            directory (str): Directory of the store.
+            segment_bytes (int): Size after which a new segment is started.
+            retention (RetentionPolicy): Which runs to keep, None for all.
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retention = retention
+        self.lock = threading.Lock()
+        self.segments = []  # по возрастанию first_run
+        self.firsts = []  # first_run сегментов — для bisect
+        self._data_fd = None  # открытые на дозапись файлы последнего сегмента
+        self._index_fd = None
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _recover(self):
+        """
+        Loads the segment list. A run is written as output, then its
+        index record, so after a crash the tail of the last segment may
+        hold output without a record or a partial record: both are cut.
+        Leftovers of an interrupted compression or drop are removed as well.
+        """
+        names = os.listdir(self.directory)
+        firsts = sorted(int(name[:-4]) for name in names
+                        if name.endswith(".idx") and name[:-4].isdigit())
+        indexed = {f"{first_run:010d}" for first_run in firsts}
+        for name in names:
+            if name.endswith(".tmp") or (".seg" in name and name.split(".")[0] not in indexed):
+                os.remove(os.path.join(self.directory, name))
+        for first_run in firsts:
+            segment = Segment(self.directory, first_run)
+            segment.count = os.path.getsize(segment.index_path) // RECORD.size
+            for codec, (extension, _) in CODECS.items():
+                if os.path.exists(segment.base + ".seg" + extension):
+                    segment.codec = codec
+                    # сжатая копия уже на месте, а исходник не успели удалить
+                    if os.path.exists(segment.base + ".seg"):
+                        os.remove(segment.base + ".seg")
+                    break
+            self.segments.append(segment)
+            self.firsts.append(first_run)
+        if not self.segments or self.segments[-1].codec is not None:
+            return
+
+        last = self.segments[-1]
+        end = 0
+        if last.count:
+            with open(last.index_path, 'rb') as f:
+                f.seek((last.count - 1) * RECORD.size)
+                offset, length, _, _ = RECORD.unpack(f.read(RECORD.size))
+            end = offset + length
+        with open(last.index_path, 'r+b') as f:
+            f.truncate(last.count * RECORD.size)
+        if os.path.exists(last.data_path):
+            with open(last.data_path, 'r+b') as f:
+                f.truncate(end)
+        last.size = end
+        if last.count:
+            with open(last.index_path, 'rb') as f:
+                last.first_timestamp = RECORD.unpack(f.read(RECORD.size))[2]
+
+    @property
+    def next_run(self):
+        """Number the next appended run will get."""
+        if not self.segments:
+            return 0
+        return self.segments[-1].first_run + self.segments[-1].count
+
+    @property
+    def first_run(self):
+        """Number of the oldest stored run."""
+        return self.segments[0].first_run if self.segments else 0
+
+    def append(self, data, timestamp, exit_code):
+        """
+        Appends the output of one run.
+
+        Args:
+            data (bytes): Output of the run.
+            timestamp (float): Start time of the run.
+            exit_code (int): Exit code, EXIT_UNKNOWN if not known.
+
+        Returns:
+            int: Number of the run.
+        """
+        with self.lock:
+            last = self.segments[-1] if self.segments else None
+            if (last is None or last.codec is not None
+                    or (last.count and (last.size + len(data) > self.segment_bytes
+                                        or self._segment_full(last, len(data), timestamp)))):
+                last = self._start_segment()
+            elif self._data_fd is None:
+                self._open_for_append(last)
+            os.write(self._data_fd, data)
+            os.write(self._index_fd, RECORD.pack(last.size, len(data), timestamp, exit_code))
+            if not last.count:
+                last.first_timestamp = timestamp
+            last.size += len(data)
+            last.count += 1
+            return last.first_run + last.count - 1
+
+    def _segment_full(self, segment, extra, now):
+        # extra — сколько байт вывода собираются дописать в сегмент
+        return (self.retention and segment.count
+                and self.retention.segment_full(segment.count, segment.size + extra,
+                                                segment.first_timestamp, now))
+
+    def _start_segment(self):
+        segment = Segment(self.directory, self.next_run)
+        self._close_files()
+        self._open_for_append(segment)
+        self.segments.append(segment)
+        self.firsts.append(segment.first_run)
+        return segment
+
+    def _open_for_append(self, segment):
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0)
+        self._data_fd = os.open(segment.data_path, flags, 0o644)
+        self._index_fd = os.open(segment.index_path, flags, 0o644)
+
+    def _close_files(self):
+        for fd in (self._data_fd, self._index_fd):
+            if fd is not None:
+                os.close(fd)
+        self._data_fd = self._index_fd = None
+
+    def close(self):
+        """Closes the files of the last segment."""
+        with self.lock:
+            self._close_files()
+
+    def __len__(self):
+        return self.next_run - self.first_run
+
+    def run(self, number):
+        """
+        Finds a run by its number.
+
+        Returns:
+            Run: Location and metadata of the run, or None if it is not stored.
+        """
+        with self.lock:
+            i = bisect.bisect_right(self.firsts, number) - 1
+            if i < 0 or number >= self.segments[i].first_run + self.segments[i].count:
+                return None
+            segment = self.segments[i]
+        records = self._read_records(segment, number, number + 1)
+        if records is None:
+            return None
+        return Run(number, segment, *RECORD.unpack(records))
+
+    def runs(self, start=0, stop=None):
+        """
+        Iterates over runs with numbers in [start, stop) in order.
+
+        Runs appended during the iteration are not included, runs of
+        segments dropped during it are skipped. Index records
+        are read segment by segment, so memory use does not depend on the
+        number of runs.
+        """
+        with self.lock:
+            segments = [(segment, segment.count) for segment in self.segments]
+            next_run = self.next_run
+            start = max(start, self._retained_from(segments, next_run))
+        stop = next_run if stop is None else min(stop, next_run)
+        now = time.time()
+        max_age = self.retention.max_age if self.retention else None
+        for segment, count in segments:
+            first = max(start, segment.first_run)
+            last = min(stop, segment.first_run + count)
+            if first >= last:
+                continue
+            records = self._read_records(segment, first, last)
+            if records is None:
+                continue  # сегмент удалён по политике хранения, пока шёл перебор
+            for i, record in enumerate(RECORD.iter_unpack(records)):
+                if max_age is not None and now - record[2] > max_age:
+                    continue  # устарел, но сегмент ещё не удалён
+                yield Run(first + i, segment, *record)
+
+    def _retained_from(self, segments, next_run):
+        """
+        Number of the oldest run kept by the run count and size limits of
+        the policy; older runs only wait for compact() to drop them. Call
+        under self.lock.
+
+        Args:
+            segments (list): (segment, run count) pairs, oldest first.
+            next_run (int): Number the next appended run will get.
+        """
+        retention = self.retention
+        if not retention or not segments:
+            return 0
+        first = 0
+        if retention.max_runs is not None:
+            first = next_run - retention.max_runs
+        if retention.max_bytes is not None:
+            # как в compact(): сегмент вне политики, если новее него
+            # на диске уже max_bytes
+            newer_bytes = self._disk_size(segments[-1][0])
+            for segment, count in reversed(segments[:-1]):
+                if newer_bytes >= retention.max_bytes:
+                    first = max(first, segment.first_run + count)
+                    break
+                newer_bytes += self._disk_size(segment)
+        return first
+
+    def _read_records(self, segment, first, last):
+        """
+        Reads the index records of runs [first, last) of a segment.
+
+        Returns:
+            bytes: The records, or None if the segment was dropped.
+        """
+        # под блокировкой: compact() помечает сегмент удалённым под ней же
+        # и только потом удаляет файлы
+        with self.lock:
+            if segment.dropped:
+                return None
+            with open(segment.index_path, 'rb') as f:
+                f.seek((first - segment.first_run) * RECORD.size)
+                return f.read((last - first) * RECORD.size)
+
+    def open_data(self, segment):
+        """
+        Opens the data file of a segment for reading.
+
+        Returns:
+            tuple: (file object, compressed); in a compressed file offsets
+            are those of the uncompressed output, and it can only be read
+            forward cheaply. None if the segment was dropped.
+        """
+        # под блокировкой: compact() не удалит файл между выбором пути и open
+        with self.lock:
+            if segment.dropped:
+                return None
+            if segment.codec is None:
+                return open(segment.data_path, 'rb'), False
+            return CODECS[segment.codec][1](segment.data_path, 'rb'), True
+
+    def read(self, run):
+        """
+        Reads the output of a run.
+
+        Args:
+            run (Run): Run returned by run() or runs().
+
+        Returns:
+            bytes: Output of the run, or None if it was dropped.
+        """
+        opened = self.open_data(run.segment)
+        if opened is None:
+            return None
+        with opened[0] as f:
+            f.seek(run.offset)
+            return f.read(run.length)
+
+    def _disk_size(self, segment):
+        return os.path.getsize(segment.data_path) + os.path.getsize(segment.index_path)
+
+    def _last_timestamp(self, segment):
+        with open(segment.index_path, 'rb') as f:
+            f.seek((segment.count - 1) * RECORD.size)
+            return RECORD.unpack(f.read(RECORD.size))[2]
+
+    def compact(self, codec="gzip", now=None):
+        """
+        Drops segments outside the retention policy and compresses the
+        sealed ones. The last segment is only sealed, when it is full by
+        the policy (runs are appended to it): the next pass may drop it.
+
+        Args:
+            codec (str): Key of CODECS, None to keep segments uncompressed.
+            now (float): Current time, for tests.
+
+        Returns:
+            tuple: (segments dropped, segments compressed).
+        """
+        now = time.time() if now is None else now
+        retention = self.retention
+        with self.lock:
+            # программа могла давно не запускаться, или сегмент заполнен
+            # до того, как политику задали, — запечатываем его сейчас
+            last = self.segments[-1] if self.segments else None
+            if last is not None and last.codec is None and self._segment_full(last, 0, now):
+                self._start_segment()
+            segments = list(self.segments)
+        sealed = segments[:-1]
+
+        # идём от новых к старым: если сегмент вне политики, то и все старше него
+        expired = 0
+        if retention and segments:
+            newer_runs = segments[-1].count
+            newer_bytes = self._disk_size(segments[-1])
+            for i in range(len(sealed) - 1, -1, -1):
+                segment = sealed[i]
+                if retention.expired(newer_runs, newer_bytes,
+                                     self._last_timestamp(segment), now):
+                    expired = i + 1
+                    break
+                newer_runs += segment.count
+                newer_bytes += self._disk_size(segment)
+        if expired:
+            with self.lock:
+                for segment in sealed[:expired]:
+                    segment.dropped = True
+                del self.segments[:expired]
+                del self.firsts[:expired]
+            for segment in sealed[:expired]:
+                # индекс первым: без него сегмента нет, а осиротевший файл
+                # данных уберёт _recover
+                os.remove(segment.index_path)
+                os.remove(segment.data_path)
+
+        compressed = 0
+        for segment in sealed[expired:]:
+            if codec is not None and segment.codec is None:
+                self._compress(segment, codec)
+                compressed += 1
+        return expired, compressed
+
+    def _compress(self, segment, codec):
+        extension, opener = CODECS[codec]
+        source = segment.data_path
+        target = source + extension
+        with open(source, 'rb') as src, opener(target + ".tmp", 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(target + ".tmp", target)
+        with self.lock:
+            segment.codec = codec
+        try:
+            os.remove(source)
+        except OSError:
+            # Windows не даёт удалить открытый читателем файл; при следующем
+            # запуске _recover уберёт его, раз сжатая копия уже есть
+            pass
@@ -7,34 +7,259 @@ Supported commands from the client:
   - start <program_name>    : Start a program if it exists and is not running.
   - stop <program_name>     : Stop a running program.
   - delete <program_name>   : Delete a program and its logs.
-  - getlog <program_name>   : Retrieve logs for the specified program.
+  - getlog <program_name> [--since N] [--tail K]
+                            : Retrieve logs for the specified program
+                              (runs starting from number N, only the last K).
+  - runs <program_name> [--since N] [--tail K]
+                            : List runs of the program: number, start time,
+                              exit code and output size.
   - programs                : List all known programs with their status.
+
+Run outputs are kept in a segmented log store (see log_store.py). A
+background compactor compresses old segments and drops them according
+to --max-runs, --max-bytes and --max-age.
+
+State changes are journaled as they happen and periodically folded into
+an atomic snapshot of state.json (see state_store.py), so a crash loses
+nothing that was acknowledged to a client.
+
+Protocol: by default a command is a single send and a response ends with
+the 'END_OF_RESPONSE' marker. A client may switch the connection to
+length-prefixed frames with request ids (see FRAMED_HELLO), which allows
+sending several commands without waiting for the responses.
 """
 
 import os
 import sys
+import asyncio
 import time
-import json
 import socket
 import threading
 import logging
 import signal
 import argparse
 import shutil
+import struct
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import Popen, PIPE
 
+from log_store import CODECS, EXIT_UNKNOWN, LogStore, RetentionPolicy
+from state_store import StateStore
+
 # Server logging configuration
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+END_OF_RESPONSE = b"'END_OF_RESPONSE'"
+
+# Framed-протокол. Клиент включает его командой FRAMED_HELLO в обычном
+# протоколе; сервер без поддержки ответит "Unknown command", и клиент
+# останется на маркерах. Дальше запрос — заголовок REQUEST_HEADER
+# (id запроса, длина) и команда в UTF-8, ответ — один или несколько
+# кадров RESPONSE_HEADER (id запроса, флаги, длина) с данными; последний
+# кадр ответа помечен FRAME_FINAL.
+FRAMED_HELLO = "proto framed"
+FRAMED_ACCEPTED = "OK framed\n"
+REQUEST_HEADER = struct.Struct(">II")
+RESPONSE_HEADER = struct.Struct(">IBI")
+FRAME_FINAL = 1
+MAX_COMMAND_BYTES = 64 * 1024
+# кусок файла, который читается в память при отправке без sendfile
+CHUNK_BYTES = 64 * 1024
+
+
 def send_response(conn, message):
     """
     Отправляет сообщение с маркером конца ответа.
     """
     if isinstance(message, str):
         message = message.encode('utf-8')
-    message += b"'END_OF_RESPONSE'"
-    conn.send(message)
+    message += END_OF_RESPONSE
+    conn.sendall(message)
+
+
+def recv_exact(conn, size):
+    """
+    Reads exactly size bytes from the socket.
+
+    Returns:
+        bytes: The data, or None if the connection was closed earlier.
+    """
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        count = conn.recv_into(view[received:])
+        if count == 0:
+            return None
+        received += count
+    return bytes(buf)
+
+
+def import_legacy_logs(store, log_files):
+    """
+    Moves logs of the old format (a log_<timestamp>.txt file per run) into
+    the log store and removes the files. Missing files are skipped.
+
+    Args:
+        store (LogStore): Log store of the program.
+        log_files (list): Paths of the old log files, oldest first.
+    """
+    for log_file in log_files:
+        if not os.path.exists(log_file):
+            continue
+        name = os.path.splitext(os.path.basename(log_file))[0]
+        stamp = name[len("log_"):]
+        timestamp = int(stamp) if stamp.isdigit() else os.path.getmtime(log_file)
+        with open(log_file, 'rb') as lf:
+            store.append(lf.read(), timestamp, EXIT_UNKNOWN)
+        os.remove(log_file)
+    logging.info(f"Old log files moved to {store.directory}")
+
+
+def send_file_range(conn, f, offset, size, compressed=False):
+    """
+    Sends size bytes of the file from offset.
+
+    A compressed segment cannot go through sendfile: its descriptor holds
+    the compressed bytes. It is read through the decompressing file object
+    and sent in chunks instead.
+    """
+    if not compressed:
+        conn.sendfile(f, offset, size)
+        return
+    f.seek(offset)
+    while size > 0:
+        chunk = f.read(min(CHUNK_BYTES, size))
+        if not chunk:
+            raise EOFError("Segment is shorter than its index")
+        conn.sendall(chunk)
+        size -= len(chunk)
+
+
+class LegacyReply:
+    """
+    Response to one command in the legacy protocol: raw data followed by
+    the END_OF_RESPONSE marker.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def send(self, message):
+        """Sends the whole response."""
+        send_response(self.conn, message)
+
+    def write(self, data):
+        """Sends a part of the response."""
+        self.conn.sendall(data)
+
+    def write_file(self, f, offset, size, suffix=b"", compressed=False):
+        """Sends size bytes of the file from offset and then suffix."""
+        send_file_range(self.conn, f, offset, size, compressed)
+        self.conn.sendall(suffix)
+
+    def end(self):
+        """Ends the response sent by write and write_file."""
+        self.conn.sendall(END_OF_RESPONSE)
+
+
+class StreamConnection:
+    """
+    Socket-like adapter over an asyncio StreamWriter for LegacyReply and
+    FramedReply in the asyncio server mode.
+
+    Its methods are called from executor threads: data is handed to the
+    event loop and the call waits for drain(), so a slow client holds
+    back only the thread serving it, not the loop.
+    """
+
+    def __init__(self, writer, loop):
+        self.writer = writer
+        self.loop = loop
+
+    async def write(self, data):
+        """Writes data to the stream from the event loop."""
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def sendall(self, data):
+        """Writes data to the stream and waits until it is flushed."""
+        if data:
+            asyncio.run_coroutine_threadsafe(self.write(data), self.loop).result()
+
+    def sendfile(self, f, offset=0, count=None):
+        """Writes count bytes of the file from offset piece by piece."""
+        f.seek(offset)
+        remaining = count
+        while remaining is None or remaining > 0:
+            chunk = f.read(CHUNK_BYTES if remaining is None else min(CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            self.sendall(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+
+
+class FramedReply:
+    """
+    Response to one request in the framed protocol: every piece is a
+    frame with the request id, the last frame is marked FRAME_FINAL.
+    """
+
+    def __init__(self, conn, request_id):
+        self.conn = conn
+        self.request_id = request_id
+
+    def send(self, message):
+        """Sends the whole response in one frame."""
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        self.conn.sendall(RESPONSE_HEADER.pack(self.request_id, FRAME_FINAL, len(message)) + message)
+
+    def write(self, data):
+        """Sends a part of the response in one frame."""
+        self.conn.sendall(RESPONSE_HEADER.pack(self.request_id, 0, len(data)) + data)
+
+    def write_file(self, f, offset, size, suffix=b"", compressed=False):
+        """Sends size bytes of the file from offset and then suffix in one frame."""
+        self.conn.sendall(RESPONSE_HEADER.pack(self.request_id, 0, size + len(suffix)))
+        # длина кадра уже отправлена, так что файл должен отдать ровно size байт
+        send_file_range(self.conn, f, offset, size, compressed)
+        self.conn.sendall(suffix)
+
+    def end(self):
+        """Ends the response sent by write and write_file with an empty final frame."""
+        self.conn.sendall(RESPONSE_HEADER.pack(self.request_id, FRAME_FINAL, 0))
+
+
+def parse_getlog_args(args):
+    """
+    Parses the arguments of getlog and runs: <program_name> [--since N] [--tail K].
+
+    Returns:
+        tuple: (prog_name, since, tail); tail is None if not given.
+
+    Raises:
+        ValueError: On an unknown option or a bad number.
+    """
+    words = args.split(" ")
+    since, tail = 0, None
+    # опции идут после имени программы, а в самом имени могут быть пробелы
+    while len(words) >= 3 and words[-2] in ("--since", "--tail"):
+        if not words[-1].isdigit():
+            raise ValueError(f"{words[-2]} expects a non-negative number")
+        value = int(words[-1])
+        if words[-2] == "--since":
+            since = value
+        else:
+            tail = value
+        del words[-2:]
+    prog_name = " ".join(words)
+    if not prog_name or prog_name.startswith("--"):
+        raise ValueError("program name is missing")
+    return prog_name, since, tail
 
 
 class ProgramRunner(threading.Thread):
@@ -44,35 +269,29 @@ class ProgramRunner(threading.Thread):
     Attributes:
         prog_name (str): Name of the program file.
         interval (int): Delay (in seconds) between runs.
-        state (dict): Shared state dict for storing logs and status.
+        store (LogStore): Log store of the program.
         running (bool): Flag to control the running loop.
     """
 
-    def __init__(self, prog_name, interval, state):
+    def __init__(self, prog_name, interval, store):
         super().__init__(daemon=True)
         self.prog_name = prog_name
         self.interval = interval
-        self.state = state
+        self.store = store
         self.running = True
 
     def run(self):
         """
-        Executes the program in a loop and writes the output to log files.
+        Executes the program in a loop and appends the output to the log store.
         """
-        log_dir = f"{self.prog_name}_logs"
-        os.makedirs(log_dir, exist_ok=True)
         while self.running:
-            timestamp = int(time.time())
-            output_file = os.path.join(log_dir, f"log_{timestamp}.txt")
-            logging.info(f"Running program {self.prog_name}, log: {output_file}")
+            timestamp = time.time()
             process = Popen([sys.executable, self.prog_name],
                             stdout=PIPE, stderr=PIPE)
             stdout, stderr = process.communicate()
-            with open(output_file, 'w', encoding='utf-8') as f_out:
-                f_out.write(stdout.decode('utf-8') + "\n" +
-                            stderr.decode('utf-8'))
-            self.state.setdefault(self.prog_name, {})\
-                      .setdefault("logs", []).append(output_file)
+            number = self.store.append(stdout + b"\n" + stderr, timestamp, process.returncode)
+            logging.info(f"Program {self.prog_name} run {number} "
+                         f"exited with code {process.returncode}")
             time.sleep(self.interval)
 
     def stop(self):
@@ -82,6 +301,36 @@ class ProgramRunner(threading.Thread):
         self.running = False
 
 
+class LogCompactor(threading.Thread):
+    """
+    Background thread that periodically applies the retention policy to
+    the log stores and compresses their sealed segments.
+
+    Attributes:
+        server (FileManagerServer): Server whose programs are compacted.
+        interval (int): Delay (in seconds) between passes.
+    """
+
+    def __init__(self, server, interval):
+        super().__init__(daemon=True)
+        self.server = server
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        """
+        Compacts the logs every interval seconds until stopped.
+        """
+        while not self.stopped.wait(self.interval):
+            self.server.compact_logs()
+
+    def stop(self):
+        """
+        Stops the compaction loop.
+        """
+        self.stopped.set()
+
+
 class FileManagerServer:
     """
     Server application for managing programs.
@@ -91,29 +340,49 @@ class FileManagerServer:
       - start <program_name>
       - stop <program_name>
       - delete <program_name>
-      - getlog <program_name>
+      - getlog <program_name> [--since N] [--tail K]
+      - runs <program_name> [--since N] [--tail K]
       - programs
     """
 
     def __init__(self, host='0.0.0.0', port=54321, state_file='state.json',
-                 interval=10):
+                 interval=10, io_workers=8, retention=None, compression="gzip",
+                 compact_interval=60):
         """
         Initialize the server.
 
         Args:
             host (str): Host address to bind.
             port (int): Port number.
-            state_file (str): JSON file for saving the state.
+            state_file (str): JSON snapshot of the state; its journal is
+                state_file + ".wal".
             interval (int): Program run interval in seconds.
+            io_workers (int): Executor threads for commands in asyncio mode.
+            retention (RetentionPolicy): Which runs to keep, None for all.
+            compression (str): Codec for sealed log segments, None for none.
+            compact_interval (int): Seconds between log compaction passes.
         """
         self.host = host
         self.port = port
         self.state_file = state_file
         self.interval = interval
-        self.state = {}  # Expected format: { prog_name: {"logs": [...], "status": "running"/"stopped"} }
+        self.io_workers = io_workers
+        self.retention = retention
+        self.compression = compression
+        self.compactor = LogCompactor(self, compact_interval)
+        self.state_store = StateStore(state_file)
+        # Expected format: { prog_name: {"status": "running"/"stopped"} };
+        # changed only through state_store, so that every change is journaled
+        self.state = {}
         self.server_socket = None
         self.running = True
         self.program_runners = {}  # Mapping of running programs: { prog_name: runner }
+        self.log_stores = {}  # Opened log stores: { prog_name: LogStore }
+        self.log_stores_lock = threading.Lock()
+        self.loop = None  # asyncio mode: event loop, its stop event,
+        self.stop_event = None  # executor for commands and open connections
+        self.executor = None
+        self.writers = set()
 
         signal.signal(signal.SIGINT, self.handle_shutdown)
 
@@ -123,26 +392,66 @@ class FileManagerServer:
         """
         logging.info("Shutdown signal received, shutting down server...")
         self.running = False
+        if self.stop_event is not None:
+            # в asyncio-режиме сервер останавливает сам цикл событий
+            self.loop.call_soon_threadsafe(self.stop_event.set)
+            return
         self.shutdown()
 
     def load_state(self):
         """
-        Loads the JSON state from state_file.
+        Loads the state: the snapshot from state_file plus the journal of
+        changes made after it.
         """
-        if os.path.exists(self.state_file):
-            with open(self.state_file, 'r', encoding='utf-8') as f:
-                self.state = json.load(f)
-                logging.info("State loaded")
-        else:
-            self.state = {}
+        self.state = self.state_store.load()
+        logging.info(f"State loaded: {len(self.state)} programs")
 
     def save_state(self):
         """
-        Saves the current state to state_file.
+        Writes a snapshot of the state to state_file and empties the journal.
+        """
+        self.state_store.snapshot()
+        logging.info("State saved")
+
+    def get_log_store(self, prog_name):
         """
-        with open(self.state_file, 'w', encoding='utf-8') as f:
-            json.dump(self.state, f, indent=4, ensure_ascii=False)
-            logging.info("State saved")
+        Returns the log store of the program, opening it on first use.
+
+        Logs of the old format (a log_<timestamp>.txt file per run listed
+        in state) are moved into the store and their files are removed.
+
+        Args:
+            prog_name (str): Name of the program.
+
+        Returns:
+            LogStore: Log store of the program.
+        """
+        with self.log_stores_lock:
+            store = self.log_stores.get(prog_name)
+            if store is None:
+                store = LogStore(f"{prog_name}_logs", retention=self.retention)
+                legacy_logs = self.state.get(prog_name, {}).get("logs")
+                if legacy_logs:
+                    import_legacy_logs(store, legacy_logs)
+                if legacy_logs is not None:
+                    self.state_store.unset(prog_name, "logs")
+                self.log_stores[prog_name] = store
+            return store
+
+    def compact_logs(self):
+        """
+        Applies the retention policy and compression to the logs of all
+        known programs.
+        """
+        for prog_name in list(self.state):
+            try:
+                dropped, compressed = self.get_log_store(prog_name).compact(self.compression)
+            except OSError as e:
+                logging.error(f"Error compacting logs of {prog_name}: {e}")
+                continue
+            if dropped or compressed:
+                logging.info(f"Logs of {prog_name}: {dropped} segments dropped, "
+                             f"{compressed} compressed")
 
     def start_program(self, prog_name):
         """
@@ -170,18 +479,17 @@ if __name__ == '__main__':
 """)
             os.chmod(prog_name, 0o755)
             logging.info(f"Program {prog_name} created as a minimal Python file")
-            self.state.setdefault(prog_name, {})["logs"] = []
-            self.state[prog_name]["status"] = "stopped"
+            self.state_store.set(prog_name, "status", "stopped")
         elif not os.access(prog_name, os.X_OK):
             os.chmod(prog_name, 0o755)
             logging.info(f"Execution permissions updated for {prog_name}")
 
         if prog_name not in self.program_runners:
-            runner = ProgramRunner(prog_name, self.interval, self.state)
+            runner = ProgramRunner(prog_name, self.interval, self.get_log_store(prog_name))
             runner.start()
             self.program_runners[prog_name] = runner
             # Update status in state
-            self.state.setdefault(prog_name, {})["status"] = "running"
+            self.state_store.set(prog_name, "status", "running")
             logging.info(f"Program {prog_name} started")
             return True
         else:
@@ -201,7 +509,7 @@ if __name__ == '__main__':
         if prog_name in self.program_runners:
             runner = self.program_runners.pop(prog_name)
             runner.stop()
-            self.state.setdefault(prog_name, {})["status"] = "stopped"
+            self.state_store.set(prog_name, "status", "stopped")
             logging.info(f"Program {prog_name} stopped")
             return True
         else:
@@ -226,6 +534,10 @@ if __name__ == '__main__':
             except Exception as e:
                 logging.error(f"Error deleting file {prog_name}: {e}")
                 return False
+        with self.log_stores_lock:
+            store = self.log_stores.pop(prog_name, None)
+        if store is not None:
+            store.close()
         log_dir = f"{prog_name}_logs"
         if os.path.exists(log_dir) and os.path.isdir(log_dir):
             try:
@@ -235,7 +547,7 @@ if __name__ == '__main__':
                 logging.error(f"Error deleting directory {log_dir}: {e}")
                 return False
         if prog_name in self.state:
-            del self.state[prog_name]
+            self.state_store.delete(prog_name)
         return True
 
     def get_programs_status(self):
@@ -255,10 +567,145 @@ if __name__ == '__main__':
             output += f"{prog}: {status}\n"
         return output
 
+    def select_runs(self, prog_name, since=0, tail=None):
+        """
+        Picks runs for getlog and runs.
+
+        Args:
+            prog_name (str): Name of the program.
+            since (int): Number of the first run (0 is the first run ever).
+            tail (int): Only the last tail runs, None for all.
+
+        Returns:
+            iterator: Run records of the selected runs, oldest first.
+        """
+        store = self.get_log_store(prog_name)
+        # конец берём сейчас: запуски, дописанные во время ответа, не отдаём
+        stop = store.next_run
+        start = since if tail is None else max(since, stop - tail)
+        return store.runs(start, stop)
+
+    def send_logs(self, reply, prog_name, since=0, tail=None):
+        """
+        Streams the logs of runs since..end (only the last tail of them)
+        to the client and ends the response.
+
+        Outputs are sent with socket.sendfile straight from the segment
+        files (compressed segments are decompressed in chunks), so memory
+        use does not depend on the size of the logs.
+
+        Args:
+            reply: LegacyReply or FramedReply of the command.
+            prog_name (str): Name of the program.
+            since (int): Number of the first run to send (0 is the first run).
+            tail (int): Send only the last tail runs, None for all.
+        """
+        store = self.get_log_store(prog_name)
+        segment, opened = None, None
+        try:
+            for run in self.select_runs(prog_name, since, tail):
+                if run.segment is not segment:
+                    if opened is not None:
+                        opened[0].close()
+                    segment, opened = run.segment, store.open_data(run.segment)
+                if opened is None:
+                    continue  # сегмент удалён по политике хранения, пока шёл ответ
+                f, compressed = opened
+                reply.write_file(f, run.offset, run.length, b"\n", compressed)
+        finally:
+            if opened is not None:
+                opened[0].close()
+        reply.end()
+
+    def send_runs(self, reply, prog_name, since=0, tail=None):
+        """
+        Sends the list of runs: number, start time, exit code, output size.
+
+        Args:
+            reply: LegacyReply or FramedReply of the command.
+            prog_name (str): Name of the program.
+            since (int): Number of the first run to list.
+            tail (int): List only the last tail runs, None for all.
+        """
+        lines = []
+        for run in self.select_runs(prog_name, since, tail):
+            started = datetime.fromtimestamp(run.timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            code = "?" if run.exit_code == EXIT_UNKNOWN else run.exit_code
+            lines.append(f"{run.number}\t{started}\texit {code}\t{run.length} bytes\n")
+            # отправляем пачками, а не одной строкой на все запуски
+            if len(lines) == 256:
+                reply.write("".join(lines).encode('utf-8'))
+                lines = []
+        if lines:
+            reply.write("".join(lines).encode('utf-8'))
+        reply.end()
+
+    def execute_command(self, command, reply):
+        """
+        Executes one client command and sends its response.
+
+        Args:
+            command (str): Command line without the trailing newline.
+            reply: LegacyReply or FramedReply to answer through.
+        """
+        if command.startswith("add "):
+            prog_name = command.split(" ", 1)[1]
+            result = self.start_program(prog_name)
+            if result:
+                reply.send(f"Program {prog_name} added and started\n")
+            else:
+                reply.send(f"Program {prog_name} already exists\n")
+        elif command.startswith("start "):
+            prog_name = command.split(" ", 1)[1]
+            if prog_name in self.program_runners:
+                reply.send(f"Program {prog_name} is already running\n")
+            else:
+                if os.path.exists(prog_name):
+                    result = self.start_program(prog_name)
+                    if result:
+                        reply.send(f"Program {prog_name} started\n")
+                    else:
+                        reply.send(f"Error starting program {prog_name}\n")
+                else:
+                    reply.send(f"Program file {prog_name} not found\n")
+        elif command.startswith("getlog ") or command.startswith("runs "):
+            name, args = command.split(" ", 1)
+            try:
+                prog_name, since, tail = parse_getlog_args(args)
+            except ValueError as e:
+                reply.send(f"Usage: {name} <program_name> [--since N] [--tail K] ({e})\n")
+                return
+            if prog_name not in self.state:
+                reply.send(f"Program {prog_name} not found\n")
+            elif name == "getlog":
+                self.send_logs(reply, prog_name, since, tail)
+            else:
+                self.send_runs(reply, prog_name, since, tail)
+        elif command.startswith("stop "):
+            prog_name = command.split(" ", 1)[1]
+            if self.stop_program(prog_name):
+                reply.send(f"Program {prog_name} stopped\n")
+            else:
+                reply.send(f"Program {prog_name} is not running\n")
+        elif command.startswith("delete "):
+            prog_name = command.split(" ", 1)[1]
+            if self.delete_program(prog_name):
+                reply.send(f"Program {prog_name} deleted\n")
+            else:
+                reply.send(f"Error deleting program {prog_name}\n")
+        elif command == "programs":
+            reply.send(self.get_programs_status())
+        else:
+            reply.send("Unknown command\n")
+
     def client_handler(self, conn, addr):
         """
         Handles client commands.
 
+        The connection starts in the legacy protocol (a command per recv,
+        a response ending with the END_OF_RESPONSE marker). After the
+        FRAMED_HELLO command it switches to length-prefixed frames.
+
         Args:
             conn: Client connection socket.
             addr: Client address.
@@ -270,62 +717,47 @@ if __name__ == '__main__':
                 if not data:
                     break
                 command = data.decode('utf-8').strip()
-                if command.startswith("add "):
-                    prog_name = command.split(" ", 1)[1]
-                    result = self.start_program(prog_name)
-                    if result:
-                        send_response(conn,f"Program {prog_name} added and started\n".encode('utf-8'))
-                    else:
-                        send_response(conn,f"Program {prog_name} already exists\n".encode('utf-8'))
-                elif command.startswith("start "):
-                    prog_name = command.split(" ", 1)[1]
-                    if prog_name in self.program_runners:
-                        send_response(conn,f"Program {prog_name} is already running\n".encode('utf-8'))
-                    else:
-                        if os.path.exists(prog_name):
-                            result = self.start_program(prog_name)
-                            if result:
-                                send_response(conn,f"Program {prog_name} started\n".encode('utf-8'))
-                            else:
-                                send_response(conn,f"Error starting program {prog_name}\n".encode('utf-8'))
-                        else:
-                            send_response(conn,f"Program file {prog_name} not found\n".encode('utf-8'))
-                elif command.startswith("getlog "):
-                    prog_name = command.split(" ", 1)[1]
-                    if prog_name in self.state and "logs" in self.state[prog_name]:
-                        combined_output = ""
-                        for log_file in self.state[prog_name]["logs"]:
-                            if os.path.exists(log_file):
-                                with open(log_file, 'r', encoding='utf-8') as lf:
-                                    combined_output += lf.read() + "\n"
-                        send_response(conn,combined_output.encode('utf-8'))
-                    else:
-                        send_response(conn,f"Program {prog_name} not found\n".encode('utf-8'))
-                elif command.startswith("stop "):
-                    prog_name = command.split(" ", 1)[1]
-                    if self.stop_program(prog_name):
-                        send_response(conn,f"Program {prog_name} stopped\n".encode('utf-8'))
-                    else:
-                        send_response(conn,f"Program {prog_name} is not running\n".encode('utf-8'))
-                elif command.startswith("delete "):
-                    prog_name = command.split(" ", 1)[1]
-                    if self.delete_program(prog_name):
-                        send_response(conn,f"Program {prog_name} deleted\n".encode('utf-8'))
-                    else:
-                        send_response(conn,f"Error deleting program {prog_name}\n".encode('utf-8'))
-                elif command == "programs":
-                    status_output = self.get_programs_status()
-                    send_response(conn,status_output.encode('utf-8'))
-                else:
-                    send_response(conn, "Unknown command\n".encode('utf-8'))
+                if command == FRAMED_HELLO:
+                    send_response(conn, FRAMED_ACCEPTED)
+                    self.framed_handler(conn, addr)
+                    break
+                self.execute_command(command, LegacyReply(conn))
         finally:
             conn.close()
 
+    def framed_handler(self, conn, addr):
+        """
+        Serves a connection in the framed protocol until it is closed.
+
+        Requests are processed in the order they arrive, so a client may
+        send several of them without waiting (pipelining) and match the
+        responses by request id.
+
+        Args:
+            conn: Client connection socket.
+            addr: Client address.
+        """
+        logging.info(f"Connection {addr} switched to framed protocol")
+        while True:
+            header = recv_exact(conn, REQUEST_HEADER.size)
+            if header is None:
+                return
+            request_id, length = REQUEST_HEADER.unpack(header)
+            if length > MAX_COMMAND_BYTES:
+                logging.error(f"Command of {length} bytes from {addr}, closing connection")
+                return
+            payload = recv_exact(conn, length)
+            if payload is None:
+                return
+            command = payload.decode('utf-8', errors='replace').strip()
+            self.execute_command(command, FramedReply(conn, request_id))
+
     def run_server(self):
         """
         Starts the server and begins accepting client connections.
         """
         self.load_state()
+        self.compactor.start()
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.bind((self.host, self.port))
         self.server_socket.listen(5)
@@ -348,11 +780,103 @@ if __name__ == '__main__':
         finally:
             self.shutdown()
 
+    async def async_client_handler(self, reader, writer):
+        """
+        Handles client commands in asyncio mode.
+
+        Same protocols as client_handler. Reading happens on the event
+        loop, and commands run one at a time per connection in the
+        bounded executor, since they do blocking file I/O.
+
+        Args:
+            reader: asyncio StreamReader of the connection.
+            writer: asyncio StreamWriter of the connection.
+        """
+        addr = writer.get_extra_info('peername')
+        logging.info(f"New connection from {addr}")
+        conn = StreamConnection(writer, self.loop)
+        self.writers.add(writer)
+        try:
+            while True:
+                data = await reader.read(1024)
+                if not data:
+                    break
+                command = data.decode('utf-8').strip()
+                if command == FRAMED_HELLO:
+                    await conn.write(FRAMED_ACCEPTED.encode('utf-8') + END_OF_RESPONSE)
+                    await self.async_framed_handler(reader, conn, addr)
+                    break
+                await self.loop.run_in_executor(self.executor, self.execute_command,
+                                                command, LegacyReply(conn))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def async_framed_handler(self, reader, conn, addr):
+        """
+        Serves a connection in the framed protocol in asyncio mode.
+
+        Args:
+            reader: asyncio StreamReader of the connection.
+            conn (StreamConnection): Writer side of the connection.
+            addr: Client address.
+        """
+        logging.info(f"Connection {addr} switched to framed protocol")
+        while True:
+            header = await reader.readexactly(REQUEST_HEADER.size)
+            request_id, length = REQUEST_HEADER.unpack(header)
+            if length > MAX_COMMAND_BYTES:
+                logging.error(f"Command of {length} bytes from {addr}, closing connection")
+                return
+            payload = await reader.readexactly(length)
+            command = payload.decode('utf-8', errors='replace').strip()
+            await self.loop.run_in_executor(self.executor, self.execute_command,
+                                            command, FramedReply(conn, request_id))
+
+    async def serve_async(self):
+        """
+        Runs the asyncio server until the shutdown signal.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        server = await asyncio.start_server(self.async_client_handler,
+                                            self.host, self.port, backlog=1024)
+        logging.info(f"Server running on {self.host}:{self.port} (asyncio, "
+                     f"{self.io_workers} I/O workers)")
+        await self.stop_event.wait()
+        server.close()
+        # wait_closed ждёт и открытые соединения — закрываем их сами
+        for writer in list(self.writers):
+            writer.close()
+        await server.wait_closed()
+
+    def run_async_server(self):
+        """
+        Starts the server in asyncio mode: all connections are served by
+        one event loop, blocking work goes to a bounded thread pool.
+        """
+        self.load_state()
+        self.compactor.start()
+        self.executor = ThreadPoolExecutor(max_workers=self.io_workers,
+                                           thread_name_prefix="io")
+        try:
+            asyncio.run(self.serve_async())
+        except Exception as e:
+            logging.error(f"Server error: {e}")
+        finally:
+            # не ждём команды, застрявшие на медленных клиентах: их потоки
+            # сами завершатся, когда закроются соединения
+            self.executor.shutdown(wait=False)
+            self.shutdown()
+
     def shutdown(self):
         """
         Stops the server, stops all running programs, and saves state.
         """
         self.running = False
+        self.compactor.stop()
         for prog in list(self.program_runners.keys()):
             self.stop_program(prog)
         self.save_state()
@@ -370,9 +894,34 @@ def main():
                         help="Server port (default: 54321)")
     parser.add_argument('--interval', type=int, default=10,
                         help="Interval between program runs (default: 10 sec)")
+    parser.add_argument('--mode', choices=('threads', 'asyncio'), default='threads',
+                        help="A thread per connection or one event loop "
+                             "for all connections (default: threads)")
+    parser.add_argument('--io-workers', type=int, default=8,
+                        help="Threads for blocking work in asyncio mode (default: 8)")
+    parser.add_argument('--max-runs', type=int,
+                        help="Keep only the last N runs of each program")
+    parser.add_argument('--max-bytes', type=int,
+                        help="Keep only the newest runs taking N bytes on disk per program")
+    parser.add_argument('--max-age', type=float,
+                        help="Keep only runs started less than N seconds ago")
+    parser.add_argument('--compress', choices=('gzip', 'zstd', 'none'), default='gzip',
+                        help="Compression of old log segments (default: gzip; "
+                             "zstd needs the zstandard package)")
+    parser.add_argument('--compact-interval', type=int, default=60,
+                        help="Interval between log compaction passes (default: 60 sec)")
     args = parser.parse_args()
-    server = FileManagerServer(port=args.port, interval=args.interval)
-    server.run_server()
+    if args.compress != 'none' and args.compress not in CODECS:
+        parser.error(f"--compress {args.compress}: the zstandard package is not installed")
+    retention = RetentionPolicy(args.max_runs, args.max_bytes, args.max_age)
+    server = FileManagerServer(port=args.port, interval=args.interval,
+                               io_workers=args.io_workers, retention=retention,
+                               compression=None if args.compress == 'none' else args.compress,
+                               compact_interval=args.compact_interval)
+    if args.mode == 'asyncio':
+        server.run_async_server()
+    else:
+        server.run_server()
 
 
 if __name__ == '__main__':
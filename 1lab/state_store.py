@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Crash-safe persistence of the server state.
+
+The state ({ prog_name: { key: value } }) lives in two files:
+
+  <state_file>      - snapshot: the whole state as JSON.
+  <state_file>.wal  - journal: one JSON line per change made after the
+                      snapshot was taken.
+
+A change is appended to the journal and synced to disk before it is
+applied, so it costs one short write regardless of the state size.
+Every snapshot_every changes (and on close) a new snapshot is written to
+a temporary file and renamed over the old one, and then the journal is
+emptied. load() reads the snapshot and replays the journal. Journal
+entries set or delete values, so replaying one that is already in the
+snapshot is harmless.
+"""
+
+import os
+import json
+import threading
+
+SNAPSHOT_EVERY = 1000
+
+
+def apply_entry(state, entry):
+    """
+    Applies one journal entry to the state.
+
+    Args:
+        state (dict): State to change.
+        entry (dict): {"op": "set", "prog", "key", "value"},
+            {"op": "unset", "prog", "key"} or {"op": "delete", "prog"}.
+    """
+    op, prog_name = entry["op"], entry["prog"]
+    if op == "set":
+        state.setdefault(prog_name, {})[entry["key"]] = entry["value"]
+    elif op == "unset":
+        state.get(prog_name, {}).pop(entry["key"], None)
+    elif op == "delete":
+        state.pop(prog_name, None)
+
+
+class StateStore:
+    """
+    Snapshot plus write-ahead journal of the server state.
+
+    Attributes:
+        path (str): Snapshot file.
+        journal_path (str): Journal file.
+        state (dict): Current state; change it only through set(),
+            unset() and delete().
+    """
+
+    def __init__(self, path, snapshot_every=SNAPSHOT_EVERY):
+        """
+        Args:
+            path (str): Snapshot file, the journal is kept next to it.
+            snapshot_every (int): Journal entries between snapshots.
+        """
+        self.path = path
+        self.journal_path = path + ".wal"
+        self.snapshot_every = snapshot_every
+        self.state = {}
+        self.lock = threading.Lock()
+        self._journal = None
+        self._entries = 0
+
+    def load(self):
+        """
+        Loads the snapshot and replays the journal. A torn last line (the
+        server died while writing it) is cut off.
+
+        Returns:
+            dict: The state.
+        """
+        with self.lock:
+            state = {}
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            entries = 0
+            valid_end = 0
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'r+b') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            break
+                        if not line.endswith(b"\n"):
+                            break
+                        apply_entry(state, entry)
+                        entries += 1
+                        valid_end += len(line)
+                    f.truncate(valid_end)
+            self.state = state
+            self._entries = entries
+            self._journal = open(self.journal_path, 'ab')
+            return state
+
+    def _log(self, entry):
+        with self.lock:
+            self._journal.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b"\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            apply_entry(self.state, entry)
+            self._entries += 1
+            if self._entries >= self.snapshot_every:
+                self._snapshot()
+
+    def set(self, prog_name, key, value):
+        """Sets state[prog_name][key] = value."""
+        self._log({"op": "set", "prog": prog_name, "key": key, "value": value})
+
+    def unset(self, prog_name, key):
+        """Removes state[prog_name][key] if present."""
+        self._log({"op": "unset", "prog": prog_name, "key": key})
+
+    def delete(self, prog_name):
+        """Removes state[prog_name] if present."""
+        self._log({"op": "delete", "prog": prog_name})
+
+    def snapshot(self):
+        """Writes a snapshot of the state and empties the journal."""
+        with self.lock:
+            self._snapshot()
+
+    def _snapshot(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        # rename атомарен: на диске всегда целый снимок, старый или новый
+        os.replace(tmp_path, self.path)
+        if self._journal is not None:
+            self._journal.truncate(0)
+        self._entries = 0
+
+    def close(self):
+        """Writes the final snapshot and closes the journal."""
+        with self.lock:
+            self._snapshot()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
@@ -0,0 +1,125 @@
+import os
+import time
+
+import pytest
+
+from log_store import CODECS, RECORD, LogStore, RetentionPolicy
+
+
+def fill(store, count, size=10, start_time=1000.0):
+    for i in range(count):
+        store.append(b"%0*d" % (size, i), start_time + i, 0)
+
+
+def outputs(store):
+    return [store.read(run) for run in store.runs()]
+
+
+def test_rollover_by_size(tmp_path):
+    store = LogStore(str(tmp_path), segment_bytes=35)
+    fill(store, 10)
+    # три вывода по 10 байт влезают в сегмент, четвёртый начинает новый
+    assert [segment.first_run for segment in store.segments] == [0, 3, 6, 9]
+    assert store.read(store.run(7)) == b"0000000007"
+    assert len(store) == 10
+
+
+def test_max_runs_seals_active_segment(tmp_path):
+    # мелкие выводы не копятся в одном сегменте, который политика не может удалить
+    store = LogStore(str(tmp_path), retention=RetentionPolicy(max_runs=5))
+    fill(store, 23)
+    assert [run.number for run in store.runs()] == [18, 19, 20, 21, 22]
+    dropped, _ = store.compact(codec=None)
+    assert dropped == 3
+    assert store.first_run == 15
+    assert outputs(store)[-1] == b"0000000022"
+
+
+def test_max_age(tmp_path):
+    # runs() сверяет возраст с текущим временем, так что запуски — "недавние"
+    started = time.time() - 29.5
+    store = LogStore(str(tmp_path), retention=RetentionPolicy(max_age=10))
+    fill(store, 30, start_time=started)
+    assert store.compact(codec=None, now=started + 29.5)[0] > 0
+    # сегменты держат не больше max_age, и за пределами политики остаётся
+    # не больше одного сегмента
+    assert 9 <= store.first_run <= 20
+    assert [run.number for run in store.runs()] == list(range(20, 30))
+
+
+def test_policy_applied_to_existing_segment(tmp_path):
+    fill(LogStore(str(tmp_path)), 100)
+    store = LogStore(str(tmp_path), retention=RetentionPolicy(max_runs=5))
+    # старый сегмент ещё не удалён, но наружу видны только последние пять
+    assert [run.number for run in store.runs()] == [95, 96, 97, 98, 99]
+    store.compact(codec=None)
+    fill(store, 5, start_time=2000.0)
+    assert store.compact(codec=None)[0] == 1
+    assert store.first_run == 100
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_compaction_of_sealed_segment(tmp_path, codec):
+    store = LogStore(str(tmp_path), segment_bytes=35)
+    fill(store, 7)
+    before = outputs(store)
+    assert store.compact(codec=codec) == (0, 2)
+    # последний сегмент открыт на дозапись и не сжимается
+    assert [segment.codec for segment in store.segments] == [codec, codec, None]
+    assert outputs(store) == before
+    names = sorted(os.listdir(tmp_path))
+    assert "0000000000.seg" not in names
+    assert "0000000000.seg" + CODECS[codec][0] in names
+
+    store.close()
+    reopened = LogStore(str(tmp_path), segment_bytes=35)
+    assert outputs(reopened) == before
+
+
+def test_truncated_index_tail(tmp_path):
+    store = LogStore(str(tmp_path))
+    fill(store, 4)
+    store.close()
+    # запись индекса оборвалась на середине
+    index = os.path.join(tmp_path, "0000000000.idx")
+    with open(index, "r+b") as f:
+        f.truncate(3 * RECORD.size + 5)
+
+    store = LogStore(str(tmp_path))
+    assert len(store) == 3
+    assert os.path.getsize(index) == 3 * RECORD.size
+    # вывод четвёртого запуска без записи индекса тоже отрезан
+    assert os.path.getsize(os.path.join(tmp_path, "0000000000.seg")) == 30
+    assert store.append(b"next", 2000.0, 0) == 3
+    assert outputs(store) == [b"0000000000", b"0000000001", b"0000000002", b"next"]
+
+
+def test_truncated_data_tail(tmp_path):
+    store = LogStore(str(tmp_path))
+    fill(store, 3)
+    store.close()
+    # вывод дописан, а запись индекса — нет
+    with open(os.path.join(tmp_path, "0000000000.seg"), "ab") as f:
+        f.write(b"partial output")
+
+    store = LogStore(str(tmp_path))
+    assert len(store) == 3
+    store.append(b"next", 2000.0, 0)
+    assert outputs(store)[-1] == b"next"
+
+
+def test_segment_dropped_while_iterating(tmp_path):
+    store = LogStore(str(tmp_path), segment_bytes=35, retention=RetentionPolicy(max_runs=3))
+    fill(store, 12)
+    store.retention = None
+    runs = store.runs()
+    first = next(runs)
+    store.retention = RetentionPolicy(max_runs=3)
+    store.compact(codec=None)
+    # индекс первого сегмента уже прочитан, а удалённые следом
+    # пропускаются, а не роняют чтение с FileNotFoundError
+    rest = list(runs)
+    assert first.number == 0
+    assert [run.number for run in rest] == [1, 2, 9, 10, 11]
+    assert store.read(first) is None
+    assert store.run(0) is None
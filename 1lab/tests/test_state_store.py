@@ -0,0 +1,53 @@
+import json
+import os
+
+from state_store import StateStore
+
+
+def test_replay_after_crash(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = StateStore(path)
+    store.load()
+    store.set("a.py", "status", "running")
+    store.set("b.py", "status", "running")
+    store.unset("b.py", "status")
+    store.delete("a.py")
+    store.set("c.py", "status", "stopped")
+    # снимка нет: состояние восстанавливается только из журнала
+
+    state = StateStore(path).load()
+    assert state == {"b.py": {}, "c.py": {"status": "stopped"}}
+
+
+def test_torn_last_line_is_cut(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = StateStore(path)
+    store.load()
+    store.set("a.py", "status", "running")
+    store.set("a.py", "interval", 10)
+    store._journal.close()
+    with open(path + ".wal", "ab") as f:
+        f.write(b'{"op": "set", "prog": "a.py", "key": "sta')
+    size = os.path.getsize(path + ".wal")
+
+    store = StateStore(path)
+    assert store.load() == {"a.py": {"status": "running", "interval": 10}}
+    assert os.path.getsize(path + ".wal") < size
+    # после обрезки журнал снова пишется с целой строки
+    store.set("a.py", "status", "stopped")
+    assert StateStore(path).load()["a.py"]["status"] == "stopped"
+
+
+def test_snapshot_empties_journal(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = StateStore(path, snapshot_every=3)
+    store.load()
+    for i in range(4):
+        store.set("a.py", "runs", i)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"a.py": {"runs": 2}}
+    assert os.path.getsize(path + ".wal") > 0
+
+    store.close()
+    assert os.path.getsize(path + ".wal") == 0
+    assert StateStore(path).load() == {"a.py": {"runs": 3}}
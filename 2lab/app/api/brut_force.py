@@ -1,12 +1,28 @@
+import os
+from contextlib import contextmanager
+from typing import List, Optional
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.brut import BrutTaskRequest, BrutTaskResponse, TaskStatusResponse
+from app.schemas.brut import (BrutTaskRequest, BrutTaskResponse, TaskStatusResponse,
+                              BrutBatchRequest, BrutBatchResponse, BrutBatchTask,
+                              BrutWordlistRequest)
+from app.core.config import settings
+from app.cruds.user import get_user_by_token
 from app.db.session import AsyncSessionLocal
 from app.models.tasks import Task, TaskStatus
-from app.services.brut_force import run_brut_force
+from app.services.brut_force import cancel_job, run_brut_force, run_brut_force_batch, run_wordlist
+from app.services.hash_engine import estimate_seconds, parse_target
+from app.services.keyspace import make_keyspace
+from app.services.lookup_table import lookup_async
+from app.services.wordlist import estimate_candidates
+from app.services.result_cache import exhausted_cache, result_cache
+from app.services.worker_pool import get_pool
 from sqlalchemy.future import select
 
 router = APIRouter()
+optional_bearer = HTTPBearer(auto_error=False)
 
 
 async def get_db() -> AsyncSession:
@@ -14,38 +30,328 @@ async def get_db() -> AsyncSession:
         yield session
 
 
+async def get_user_id(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer),
+        db: AsyncSession = Depends(get_db)
+):
+    # токен необязателен: задачи без него ничьи и делят один общий бюджет
+    if credentials is None:
+        return None
+    user = await get_user_by_token(credentials.credentials, db)
+    return user.id
+
+
+def validate_job(charset: str, max_length: int, hashes, hash_type: str,
+                 min_length: int = None, mask: str = None):
+    """Проверяет параметры задачи и возвращает её Keyspace."""
+    # длину маски ограничивает только бюджет: у неё позиции бывают из одного символа
+    if not mask and max_length > 8:
+        raise HTTPException(status_code=400, detail="max_length не должен превышать 8")
+    try:
+        keyspace = make_keyspace(charset, max_length, min_length, mask)
+        if keyspace.min_length > keyspace.max_length:
+            raise ValueError("min_length больше длины пароля")
+        for hash_value in hashes:
+            parse_target(hash_type, hash_value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return keyspace
+
+
+def estimate_job(hash_type: str, charset: str, max_length: int,
+                 wordlist: str = None, rules: List[str] = (),
+                 min_length: int = None, mask: str = None) -> float:
+    # один проход по пространству (или словарю) на всех процессах пула
+    if wordlist:
+        path = os.path.join(settings.BRUT_WORDLISTS_DIR, wordlist)
+        # словарь могли удалить, пока задача ждёт, — тогда её не считаем
+        candidates = estimate_candidates(path, rules) if os.path.isfile(path) else 0
+    else:
+        candidates = make_keyspace(charset, max_length, min_length, mask).total
+    return estimate_seconds(hash_type, candidates, get_pool().workers)
+
+
+def wordlist_path(name: str) -> str:
+    # в запросе только имя файла из папки словарей — никаких путей
+    path = os.path.join(settings.BRUT_WORDLISTS_DIR, name)
+    if os.path.basename(name) != name or not os.path.isfile(path):
+        raise HTTPException(status_code=400, detail=f"Словарь {name} не найден")
+    return path
+
+
+async def check_budget(db: AsyncSession, user_id, seconds: float):
+    """
+    Отклоняет задачу дольше BRUT_MAX_JOB_SECONDS (400) и задачу, которая
+    вместе с ещё не доделанными задачами пользователя превысит
+    BRUT_USER_BUDGET_SECONDS (429).
+    """
+    if seconds > settings.BRUT_MAX_JOB_SECONDS:
+        raise HTTPException(status_code=400,
+                            detail=f"Перебор займёт ~{seconds:.0f} с при максимуме "
+                                   f"{settings.BRUT_MAX_JOB_SECONDS:.0f} с, "
+                                   f"уменьшите charset или max_length")
+
+    owner = Task.user_id == user_id if user_id is not None else Task.user_id.is_(None)
+    # задачи одной пачки перебираются за один проход — считаем проход один раз
+    columns = (Task.hash_type, Task.charset, Task.max_length, Task.wordlist, Task.rules,
+               Task.min_length, Task.mask)
+    result = await db.execute(
+        select(*columns, func.min(Task.progress))
+        .where(owner, Task.status == TaskStatus.running)
+        .group_by(*columns)
+    )
+    load = sum(estimate_job(hash_type, charset, max_length, wordlist,
+                            rules.split(",") if rules else [], min_length, mask)
+               * (100 - progress) / 100
+               for hash_type, charset, max_length, wordlist, rules, min_length, mask, progress
+               in result.all())
+    over = load + seconds - settings.BRUT_USER_BUDGET_SECONDS
+    if over > 0:
+        raise HTTPException(status_code=429,
+                            detail=f"Бюджет исчерпан: в работе ~{load:.0f} с перебора, "
+                                   f"лимит {settings.BRUT_USER_BUDGET_SECONDS:.0f} с",
+                            headers={"Retry-After": str(int(over) + 1)})
+
+
+@contextmanager
+def pool_reservation(needed: bool):
+    """
+    Занимает место в очереди пула до создания задачи, иначе отвечает 503.
+    Если до передачи задачи в фон что-то упало (например, commit), место
+    возвращается — дальше его освобождает pool.job() в фоновой задаче.
+    """
+    if not needed:
+        yield
+        return
+    pool = get_pool()
+    if not pool.try_reserve():
+        raise HTTPException(status_code=503, detail="Очередь брутфорса переполнена, повторите позже",
+                            headers={"Retry-After": "5"})
+    try:
+        yield
+    except BaseException:
+        pool.unreserve()
+        raise
+
+
+async def known_answer(db: AsyncSession, hash_type: str, hash_value: str, charset: str,
+                       max_length: int, mask: str = None):
+    """
+    Пытается ответить без перебора: кеш взломанных хешей, кеш пустых
+    переборов, затем предвычисленные таблицы. Возвращает (пароль или None,
+    известно ли, что перебор ничего не найдёт). Кеш пустых переборов и
+    таблицы знают только charset, так что для маски смотрится лишь первый кеш.
+    """
+    password = await result_cache.lookup(db, hash_type, hash_value)
+    if password is not None:
+        return password, False
+    if mask:
+        return None, False
+    if await exhausted_cache.covers(db, hash_type, hash_value, charset, max_length):
+        return None, True
+
+    password, covered = await lookup_async(hash_type, charset, max_length,
+                                           bytes.fromhex(hash_value))
+    # ответ из таблиц запоминаем в кешах — commit вместе с задачей
+    if password is not None:
+        await result_cache.remember(db, hash_type, hash_value, password)
+    elif covered:
+        await exhausted_cache.remember(db, hash_type, hash_value, charset, max_length)
+    return password, password is None and covered
+
+
+def known_status(password, hopeless: bool) -> TaskStatus:
+    # статус задачи, ответ на которую уже известен из кешей
+    if password is not None:
+        return TaskStatus.completed
+    if hopeless:
+        return TaskStatus.failed
+    return TaskStatus.running
+
+
 @router.post("/brut_hash", response_model=BrutTaskResponse)
 async def brut_hash(
         request: BrutTaskRequest,
         background_tasks: BackgroundTasks,
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        user_id: Optional[int] = Depends(get_user_id)
 ):
-    if request.max_length > 8:
-        raise HTTPException(status_code=400, detail="max_length не должен превышать 8")
+    keyspace = validate_job(request.charset, request.max_length, [request.hash], request.hash_type,
+                            request.min_length, request.mask)
+    hash_value = parse_target(request.hash_type, request.hash).hex()
+
+    # Уже известный пароль: задача сразу создаётся завершённой,
+    # уже перебранное без результата пространство — сразу проваленной
+    password, hopeless = await known_answer(db, request.hash_type, hash_value,
+                                            request.charset, keyspace.max_length, request.mask)
+    run_needed = password is None and not hopeless
+    estimated = 0
+    if run_needed:
+        estimated = estimate_job(request.hash_type, request.charset, keyspace.max_length,
+                                 min_length=keyspace.min_length, mask=request.mask)
+        await check_budget(db, user_id, estimated)
+
+    with pool_reservation(run_needed):
+        # Создаём новую задачу в базе данных
+        new_task = Task(
+            hash_value=hash_value,
+            hash_type=request.hash_type,
+            charset=request.charset,
+            max_length=keyspace.max_length,
+            min_length=keyspace.min_length,
+            mask=request.mask,
+            status=known_status(password, hopeless),
+            progress=0 if run_needed else 100,
+            result=password,
+            user_id=user_id
+        )
+        db.add(new_task)
+        await db.commit()
+        await db.refresh(new_task)
+
+        if run_needed:
+            # Добавляем фоновую задачу, которая выполнит брутфорс и обновит задачу в БД
+            background_tasks.add_task(
+                run_brut_force,
+                new_task.id,  # передаём ID задачи из БД
+                hash_value,  # хеш, который надо перебрать
+                request.charset,  # словарь символов
+                keyspace.max_length,
+                request.hash_type,
+                keyspace.min_length,
+                request.mask  # маска вместо charset, если задана
+            )
+
+    return BrutTaskResponse(task_id=new_task.id, estimated_seconds=estimated,
+                            keyspace_size=keyspace.total)
+
+
+@router.post("/brut_hash_batch", response_model=BrutBatchResponse)
+async def brut_hash_batch(
+        request: BrutBatchRequest,
+        background_tasks: BackgroundTasks,
+        db: AsyncSession = Depends(get_db),
+        user_id: Optional[int] = Depends(get_user_id)
+):
+    """
+    Пачка хешей с общими charset и длинами (или маской) перебирается за один проход.
+    На каждый хеш заводится своя задача, статус — через /get_status.
+    """
+    if not request.hashes:
+        raise HTTPException(status_code=400, detail="Список хешей пуст")
+    if len(request.hashes) > settings.BRUT_BATCH_MAX:
+        raise HTTPException(status_code=400,
+                            detail=f"Не больше {settings.BRUT_BATCH_MAX} хешей за раз")
+    keyspace = validate_job(request.charset, request.max_length, request.hashes, request.hash_type,
+                            request.min_length, request.mask)
+
+    # одинаковые хеши (в том числе в разном регистре) перебираем один раз
+    hashes = list(dict.fromkeys(parse_target(request.hash_type, h).hex() for h in request.hashes))
+    cached = {}
+    hopeless = set()
+    for hash_value in hashes:
+        password, is_hopeless = await known_answer(db, request.hash_type, hash_value,
+                                                   request.charset, keyspace.max_length,
+                                                   request.mask)
+        if password is not None:
+            cached[hash_value] = password
+        elif is_hopeless:
+            hopeless.add(hash_value)
+    known = cached.keys() | hopeless
+    estimated = 0
+    if len(known) < len(hashes):
+        estimated = estimate_job(request.hash_type, request.charset, keyspace.max_length,
+                                 min_length=keyspace.min_length, mask=request.mask)
+        await check_budget(db, user_id, estimated)
+
+    with pool_reservation(len(known) < len(hashes)):
+        tasks = {
+            hash_value: Task(
+                hash_value=hash_value,
+                hash_type=request.hash_type,
+                charset=request.charset,
+                max_length=keyspace.max_length,
+                min_length=keyspace.min_length,
+                mask=request.mask,
+                status=known_status(cached.get(hash_value), hash_value in hopeless),
+                progress=100 if hash_value in known else 0,
+                result=cached.get(hash_value),
+                user_id=user_id
+            )
+            for hash_value in hashes
+        }
+        db.add_all(tasks.values())
+        await db.commit()
+
+        pending = {hash_value: task.id for hash_value, task in tasks.items()
+                   if hash_value not in known}
+        if pending:
+            background_tasks.add_task(
+                run_brut_force_batch,
+                pending,
+                request.charset,
+                keyspace.max_length,
+                request.hash_type,
+                keyspace.min_length,
+                request.mask
+            )
+
+    return BrutBatchResponse(tasks=[
+        BrutBatchTask(hash=hash_value, task_id=task.id) for hash_value, task in tasks.items()
+    ], estimated_seconds=estimated, keyspace_size=keyspace.total)
 
-    # Создаём новую задачу в базе данных
-    new_task = Task(
-        hash_value=request.hash,  # или request.hash_value, если так определено в схеме
-        charset=request.charset,
-        max_length=request.max_length,
-        status=TaskStatus.running,
-        progress=0,
-        result=None
-    )
-    db.add(new_task)
-    await db.commit()
-    await db.refresh(new_task)
-
-    # Добавляем фоновую задачу, которая выполнит брутфорс и обновит задачу в БД
-    background_tasks.add_task(
-        run_brut_force,
-        new_task.id,  # передаём ID задачи из БД
-        request.hash,  # хеш, который надо перебрать
-        request.charset,  # словарь символов
-        request.max_length
-    )
 
-    return BrutTaskResponse(task_id=new_task.id)
+@router.post("/brut_wordlist", response_model=BrutTaskResponse)
+async def brut_wordlist(
+        request: BrutWordlistRequest,
+        background_tasks: BackgroundTasks,
+        db: AsyncSession = Depends(get_db),
+        user_id: Optional[int] = Depends(get_user_id)
+):
+    """
+    Атака по словарю с необязательными правилами (case, digits, leet).
+    Словарь читается потоково и делится между процессами пула по байтам.
+    """
+    path = wordlist_path(request.wordlist)
+    try:
+        hash_value = parse_target(request.hash_type, request.hash).hex()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    password = await result_cache.lookup(db, request.hash_type, hash_value)
+    estimated = 0
+    if password is None:
+        estimated = estimate_job(request.hash_type, "", 0, request.wordlist, request.rules)
+        await check_budget(db, user_id, estimated)
+
+    with pool_reservation(password is None):
+        new_task = Task(
+            hash_value=hash_value,
+            hash_type=request.hash_type,
+            charset="",
+            max_length=0,
+            wordlist=request.wordlist,
+            rules=",".join(request.rules),
+            status=known_status(password, False),
+            progress=0 if password is None else 100,
+            result=password,
+            user_id=user_id
+        )
+        db.add(new_task)
+        await db.commit()
+        await db.refresh(new_task)
+
+        if password is None:
+            background_tasks.add_task(
+                run_wordlist,
+                new_task.id,
+                hash_value,
+                path,
+                request.rules,
+                request.hash_type
+            )
+
+    return BrutTaskResponse(task_id=new_task.id, estimated_seconds=estimated)
 
 
 @router.get("/get_status", response_model=TaskStatusResponse)
@@ -60,3 +366,25 @@ async def get_status(task_id: int, db: AsyncSession = Depends(get_db)):
         progress=task.progress,
         result=task.result
     )
+
+
+@router.delete("/tasks/{task_id}", response_model=TaskStatusResponse)
+async def cancel_task(task_id: int, db: AsyncSession = Depends(get_db),
+                      user_id: Optional[int] = Depends(get_user_id)):
+    """
+    Останавливает перебор задачи и помечает её cancelled. Процессы пула
+    освобождаются, как только шарды увидят флаг отмены.
+    """
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task.user_id is not None and task.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Задача принадлежит другому пользователю")
+    if task.status != TaskStatus.running:
+        raise HTTPException(status_code=409, detail=f"Задача уже завершена: {task.status.value}")
+
+    task.status = TaskStatus.cancelled
+    await db.commit()
+    # статус пишем раньше остановки: итог перебора не перезапишет cancelled
+    cancel_job(task_id)
+    return TaskStatusResponse(status=task.status.value, progress=task.progress, result=task.result)
@@ -5,6 +5,27 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key"
     JWT_ALGORITHM: str = "HS256"
 
+    # Пул процессов для брутфорса (0 — по числу ядер)
+    BRUT_WORKERS: int = 0
+    # сколько задач перебираются одновременно и сколько ждут в очереди
+    BRUT_MAX_JOBS: int = 2
+    BRUT_QUEUE_SIZE: int = 8
+    # не чаще чем раз в столько мс прогресс задач пишется в таблицу tasks
+    BRUT_PROGRESS_INTERVAL_MS: int = 500
+    # сколько хешей можно прислать в /brut/brut_hash_batch за раз
+    BRUT_BATCH_MAX: int = 1000
+    # сколько взломанных хешей держать в памяти перед таблицей cracked_hashes
+    BRUT_CACHE_SIZE: int = 10000
+    # папка с предвычисленными таблицами (python -m app.services.lookup_table)
+    BRUT_TABLES_DIR: str = "./app/db/tables"
+    # папка со словарями для /brut/brut_wordlist (в запросе — имя файла в ней)
+    BRUT_WORDLISTS_DIR: str = "./app/db/wordlists"
+    # задачи дольше этого (по оценке, в секундах) не принимаются
+    BRUT_MAX_JOB_SECONDS: float = 3600
+    # сколько секунд перебора (по оценке) может висеть на одном пользователе;
+    # запросы без токена делят один общий бюджет
+    BRUT_USER_BUDGET_SECONDS: float = 4 * 3600
+
     class Config:
         env_file = ".env"
 
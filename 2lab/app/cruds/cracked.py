@@ -0,0 +1,18 @@
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.cracked import CrackedHash
+
+async def get_cracked(db: AsyncSession, hash_type: str, digest: str):
+    result = await db.execute(
+        select(CrackedHash).filter(CrackedHash.hash_type == hash_type, CrackedHash.digest == digest)
+    )
+    return result.scalars().first()
+
+async def save_cracked(db: AsyncSession, hash_type: str, digest: str, password: str):
+    """Добавляет запись без commit; повторная вставка того же хеша игнорируется."""
+    await db.execute(
+        insert(CrackedHash)
+        .values(hash_type=hash_type, digest=digest, password=password)
+        .on_conflict_do_nothing(index_elements=["hash_type", "digest"])
+    )
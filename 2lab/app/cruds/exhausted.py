@@ -0,0 +1,14 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.exhausted import ExhaustedSearch
+
+async def list_exhausted(db: AsyncSession, hash_type: str, digest: str):
+    result = await db.execute(
+        select(ExhaustedSearch).filter(ExhaustedSearch.hash_type == hash_type,
+                                       ExhaustedSearch.digest == digest)
+    )
+    return result.scalars().all()
+
+def add_exhausted(db: AsyncSession, hash_type: str, digest: str, charset: str, max_length: int):
+    """Добавляет запись без commit."""
+    db.add(ExhaustedSearch(hash_type=hash_type, digest=digest, charset=charset, max_length=max_length))
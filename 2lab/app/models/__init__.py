@@ -5,3 +5,5 @@ Base = declarative_base()
 from app.models.user import User
 from app.models.token import Token
 from app.models.tasks import Task
+from app.models.cracked import CrackedHash
+from app.models.exhausted import ExhaustedSearch
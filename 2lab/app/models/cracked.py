@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, UniqueConstraint
+from app.models import Base
+
+class CrackedHash(Base):
+    __tablename__ = "cracked_hashes"
+    __table_args__ = (UniqueConstraint("hash_type", "digest", name="uq_cracked_hashes_type_digest"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    hash_type = Column(String, nullable=False)        # алгоритм, например sha256
+    digest = Column(String, nullable=False)           # хеш в hex, нижний регистр
+    password = Column(String, nullable=False)         # найденный пароль
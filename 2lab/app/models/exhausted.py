@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, Index
+from app.models import Base
+
+class ExhaustedSearch(Base):
+    """Пространство, перебранное целиком без результата."""
+    __tablename__ = "exhausted_searches"
+    __table_args__ = (Index("ix_exhausted_searches_type_digest", "hash_type", "digest"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    hash_type = Column(String, nullable=False)        # алгоритм, например sha256
+    digest = Column(String, nullable=False)           # хеш в hex, нижний регистр
+    charset = Column(String, nullable=False)          # уникальные символы, отсортированы
+    max_length = Column(Integer, nullable=False)      # перебраны длины 1..max_length
@@ -7,14 +7,20 @@ class TaskStatus(enum.Enum):
     running = "running"
     completed = "completed"
     failed = "failed"
+    cancelled = "cancelled"
 
 class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(Integer, primary_key=True, index=True)
     hash_value = Column(String, nullable=False)     # хеш RAR-архива
+    hash_type = Column(String, nullable=False, default="sha256", server_default="sha256")
     charset = Column(String, nullable=False)          # словарь символов
     max_length = Column(Integer, nullable=False)      # максимальная длина пароля
+    min_length = Column(Integer, nullable=False, default=1, server_default="1")  # минимальная длина
+    mask = Column(String, nullable=True)              # маска вида ?u?l?l?d (тогда charset пуст)
+    wordlist = Column(String, nullable=True)          # словарь для атаки по словарю (тогда charset пуст)
+    rules = Column(String, nullable=True)             # правила для словаря через запятую
     status = Column(Enum(TaskStatus), default=TaskStatus.running, nullable=False)
     progress = Column(Integer, default=0, nullable=False)
     result = Column(String, nullable=True)            # найденный пароль или null
@@ -1,20 +1,103 @@
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, field_validator, model_validator
+from app.services.hash_engine import check_hash_type
+from app.services.keyspace import normalize_charset
+from app.services.wordlist import check_rules
+
+
+def check_space(charset: str, max_length: int, mask: Optional[str]):
+    """Без маски пространство задают charset и max_length — оба обязательны."""
+    if mask:
+        return
+    if not charset:
+        raise ValueError("Нужен непустой charset или mask")
+    if max_length < 1:
+        raise ValueError("max_length должен быть не меньше 1, если не задана mask")
+
 
 class BrutTaskRequest(BaseModel):
     hash: str
-    charset: str
-    max_length: int
+    charset: str = ""
+    charset_order: str = "given"  # given или frequency — частые в паролях символы первыми
+    max_length: int = 0
+    min_length: Optional[int] = None  # по умолчанию 1, для маски — её полная длина
+    mask: Optional[str] = None  # ?l ?u ?d ?h ?H ?s ?a; тогда charset и max_length не нужны
+    hash_type: str = "sha256"
+
+    @field_validator("hash_type")
+    @classmethod
+    def validate_hash_type(cls, value: str) -> str:
+        return check_hash_type(value)
+
+    @model_validator(mode="after")
+    def validate_charset(self):
+        # повторы в charset только раздували бы пространство дублями
+        self.charset = normalize_charset(self.charset, self.charset_order)
+        check_space(self.charset, self.max_length, self.mask)
+        return self
 
 from pydantic import BaseModel
 
 class BrutTaskResponse(BaseModel):
     task_id: int
+    estimated_seconds: float = 0  # 0 — ответ уже известен, перебора не будет
+    keyspace_size: int = 0  # кандидатов после нормализации charset; 0 для словаря
 
 
 from typing import Optional
 from pydantic import BaseModel
 
 class TaskStatusResponse(BaseModel):
-    status: str  # running, completed, failed
+    status: str  # running, completed, failed, cancelled
     progress: int  # процент выполнения
     result: Optional[str] = None
+
+
+from typing import List
+from pydantic import BaseModel
+
+class BrutBatchRequest(BaseModel):
+    hashes: List[str]
+    charset: str = ""
+    charset_order: str = "given"
+    max_length: int = 0
+    min_length: Optional[int] = None
+    mask: Optional[str] = None
+    hash_type: str = "sha256"
+
+    @field_validator("hash_type")
+    @classmethod
+    def validate_hash_type(cls, value: str) -> str:
+        return check_hash_type(value)
+
+    @model_validator(mode="after")
+    def validate_charset(self):
+        self.charset = normalize_charset(self.charset, self.charset_order)
+        check_space(self.charset, self.max_length, self.mask)
+        return self
+
+class BrutBatchTask(BaseModel):
+    hash: str
+    task_id: int
+
+class BrutBatchResponse(BaseModel):
+    tasks: List[BrutBatchTask]
+    estimated_seconds: float = 0
+    keyspace_size: int = 0
+
+
+class BrutWordlistRequest(BaseModel):
+    hash: str
+    wordlist: str  # имя файла в BRUT_WORDLISTS_DIR
+    rules: List[str] = []  # case, digits, leet
+    hash_type: str = "sha256"
+
+    @field_validator("hash_type")
+    @classmethod
+    def validate_hash_type(cls, value: str) -> str:
+        return check_hash_type(value)
+
+    @field_validator("rules")
+    @classmethod
+    def validate_rules(cls, value: List[str]) -> List[str]:
+        return check_rules(value)
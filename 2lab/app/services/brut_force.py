@@ -1,73 +1,315 @@
 import asyncio
-import itertools
-import math
-from hashlib import sha256
+import os
+
+from sqlalchemy import update
 
-from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import AsyncSessionLocal
 from app.models.tasks import Task, TaskStatus
+from app.services.hash_engine import estimate_seconds, parse_target, search_many
+from app.services.keyspace import make_keyspace
+from app.services.progress import progress_writer
+from app.services.result_cache import exhausted_cache, result_cache
+from app.services.wordlist import estimate_candidates, search_wordlist, split_wordlist
+from app.services.worker_pool import cancel_requested, get_pool, report_progress
 
-# чистая sync-функция (CPU-heavy)
-import itertools
-from hashlib import sha256
+# task_id -> _Job для задач, которые ждут слота или перебираются
+_jobs = {}
+# меньше этого шард не режем — иначе пересылка задач дороже самого перебора
+MIN_SHARD_SIZE = 1 << 16
+# шардов на один процесс: быстрые процессы подбирают хвост за медленными
+SHARDS_PER_WORKER = 4
 
-def brut_force_sync(hash_value: str, charset: str, max_length: int):
-    total = sum(len(charset) ** i for i in range(1, max_length + 1))
-    processed = 0
 
-    for length in range(1, max_length + 1):
-        for candidate in itertools.product(charset, repeat=length):
-            processed += 1
-            candidate_password = ''.join(candidate)
-            candidate_hash = sha256(candidate_password.encode()).hexdigest()
+class _Job:
+    """Один проход по пространству: его задачи и asyncio-задача, которая его ведёт."""
+
+    def __init__(self, task_ids):
+        self.task_ids = set(task_ids)
+        self.runner = None
+        self.cancelled = False
+        # дошёл ли проход до pool.job(): с этого момента место в очереди
+        # освобождает он, а до того — _run_job
+        self.started = False
+
+
+def cancel_job(task_id: int) -> bool:
+    """
+    Снимает задачу с перебора (статус в БД выставляет вызывающий).
+    Если у прохода не осталось других задач, он останавливается целиком:
+    ждущий слота уходит из очереди, а запущенные шарды видят флаг отмены
+    на ближайшей проверке (раз в CHECK_EVERY кандидатов) и освобождают
+    процессы. Возвращает False, если задача уже не перебирается.
+    """
+    job = _jobs.pop(task_id, None)
+    if job is None:
+        return False
+    job.task_ids.discard(task_id)
+    progress_writer.untrack(task_id)
+    if not job.task_ids and job.runner is not None:
+        job.cancelled = True
+        job.runner.cancel()
+    return True
+
+
+async def cancel_orphaned_tasks(session_factory=AsyncSessionLocal) -> int:
+    """
+    Помечает cancelled задачи, которые остались running после перезапуска
+    или падения сервера. Фоновые задачи живут только в памяти процесса,
+    так что их уже никто не перебирает, а check_budget считал бы их
+    против бюджета пользователя вечно. Вызывается при старте, до первого
+    запроса. Возвращает число таких задач.
+    """
+    async with session_factory() as session:
+        result = await session.execute(
+            update(Task).where(Task.status == TaskStatus.running)
+            .values(status=TaskStatus.cancelled)
+        )
+        await session.commit()
+        return result.rowcount
+
+
+def split_keyspace(total: int, workers: int):
+    """Режет [0, total) на диапазоны индексов для раздачи по процессам."""
+    shard = max(MIN_SHARD_SIZE, -(-total // (workers * SHARDS_PER_WORKER)))
+    return [(start, min(start + shard, total)) for start in range(0, total, shard)]
+
 
-            if candidate_hash == hash_value:
-                return {
-                    "found": True,
-                    "password": candidate_password,
-                    "processed": processed,
-                    "total": total,
-                }
+def brut_force_shard(hashes, charset: str, max_length: int,
+                     start: int, stop: int, slot: int = None, hash_type: str = "sha256",
+                     min_length: int = None, mask: str = None):
+    """Один проход по [start, stop) сразу для всех hashes (hex-строки)."""
+    def on_progress(delta):
+        # отчитываемся о прогрессе и заодно проверяем флаг отмены
+        report_progress(slot, delta)
+        return cancel_requested(slot)
 
+    targets = {parse_target(hash_type, hash_value): hash_value for hash_value in hashes}
+    keyspace = make_keyspace(charset, max_length, min_length, mask)
+    hits, processed = search_many(keyspace, hash_type, targets,
+                                  start, stop, on_progress=on_progress)
     return {
-        "found": False,
-        "password": None,
+        "hits": {targets[digest]: password.decode() for digest, password in hits.items()},
         "processed": processed,
+    }
+
+
+def wordlist_shard(hashes, path: str, rules, start: int, stop: int,
+                   slot: int = None, hash_type: str = "sha256"):
+    """Слова словаря, начинающиеся в байтах [start, stop), для всех hashes."""
+    def on_progress(delta):
+        report_progress(slot, delta)
+        return cancel_requested(slot)
+
+    targets = {parse_target(hash_type, hash_value): hash_value for hash_value in hashes}
+    hits, processed = search_wordlist(path, hash_type, targets, start, stop, rules,
+                                      on_progress=on_progress)
+    return {
+        "hits": {targets[digest]: password.decode(errors="replace")
+                 for digest, password in hits.items()},
+        "processed": processed,
+    }
+
+
+# чистая sync-функция (CPU-heavy), перебор всего пространства в одном процессе
+def brut_force_sync(hash_value: str, charset: str, max_length: int, hash_type: str = "sha256",
+                    min_length: int = None, mask: str = None):
+    total = make_keyspace(charset, max_length, min_length, mask).total
+    result = brut_force_shard([hash_value], charset, max_length, 0, total,
+                              hash_type=hash_type, min_length=min_length, mask=mask)
+    password = result["hits"].get(hash_value)
+    return {
+        "found": password is not None,
+        "password": password,
+        "processed": result["processed"],
         "total": total,
     }
 
-import asyncio
-from concurrent.futures import ProcessPoolExecutor
 
-async def run_brut_force(task_id: int, hash_value: str, charset: str, max_length: int):
-    async with AsyncSessionLocal() as session:
-        task: Task = await session.get(Task, task_id)
-        if not task:
-            return
+async def _run_shards(pool, slot: int, total: int, hashes, shards, on_hits):
+    """
+    Раздаёт шарды — кортежи (функция, аргументы...) — по процессам пула.
+    Находки каждого завершившегося шарда сразу передаются в on_hits; когда
+    найдено всё, остальные шарды снимаются. total — сколько единиц
+    (кандидатов или байт словаря) шарды перебирают вместе.
+    Возвращает ({hash: пароль}, перебрано ли пространство целиком).
+    """
+    hits = {}
+    processed = 0
+    if not shards:
+        return hits, True
 
-        # Обновляем статус
-        task.status = TaskStatus.running
-        task.progress = 0
-        await session.commit()
+    submitted = [pool.executor.submit(*shard) for shard in shards]
+    futures = [asyncio.wrap_future(future) for future in submitted]
+    try:
+        for next_done in asyncio.as_completed(futures):
+            result = await next_done
+            processed += result["processed"]
+            new_hits = {h: p for h, p in result["hits"].items() if h not in hits}
+            if new_hits:
+                hits.update(new_hits)
+                await on_hits(new_hits)
+                if len(hits) == len(hashes):
+                    break
+        # шард останавливается раньше конца только по отмене или когда
+        # нашёл всё — так что недобор значит, что перебор был прерван
+        return hits, processed == total
+    finally:
+        # всё найдено — снимаем ещё не начатые шарды и ждём, пока
+        # запущенные увидят флаг: только после этого слот можно отдавать
+        pool.cancel(slot)
+        for future in submitted:
+            future.cancel()
+        await asyncio.gather(*futures, return_exceptions=True)
 
-    # Запускаем sync-брутфорс в другом процессе
-    loop = asyncio.get_event_loop()
-    with ProcessPoolExecutor() as executor:
-        result = await loop.run_in_executor(
-            executor,
-            brut_force_sync,
-            hash_value, charset, max_length
-        )
 
-    # Сохраняем результат в базу
+async def _finish_tasks(results, exhausted=None):
+    """
+    Записывает итог задач {task_id: пароль или None} одной транзакцией;
+    найденные пароли попадают в кеш взломанных хешей, отменённые задачи
+    не трогаются. exhausted — (charset, max_length), если пространство
+    перебрано полностью: тогда ненайденные хеши запоминаются как
+    безнадёжные для него.
+    """
     async with AsyncSessionLocal() as session:
-        task: Task = await session.get(Task, task_id)
-        if result["found"]:
-            task.status = TaskStatus.completed
-            task.result = result["password"]
-        else:
-            task.status = TaskStatus.failed
-            task.result = None
-
-        task.progress = 100
+        for task_id, password in results.items():
+            task: Task = await session.get(Task, task_id)
+            if task.status == TaskStatus.cancelled:
+                continue
+            if password is not None:
+                task.status = TaskStatus.completed
+                task.result = password
+                digest = parse_target(task.hash_type, task.hash_value).hex()
+                await result_cache.remember(session, task.hash_type, digest, password)
+            else:
+                task.status = TaskStatus.failed
+                task.result = None
+                if exhausted is not None:
+                    digest = parse_target(task.hash_type, task.hash_value).hex()
+                    await exhausted_cache.remember(session, task.hash_type, digest, *exhausted)
+
+            task.progress = 100
         await session.commit()
+
+
+async def run_brut_force(task_id: int, hash_value: str, charset: str, max_length: int,
+                         hash_type: str = "sha256", min_length: int = None, mask: str = None):
+    """
+    Фоновая задача. Место в очереди пула должно быть заранее занято
+    через try_reserve(), здесь оно освобождается.
+    """
+    await run_brut_force_batch({hash_value: task_id}, charset, max_length, hash_type,
+                               min_length, mask)
+
+
+async def run_brut_force_batch(tasks, charset: str, max_length: int, hash_type: str = "sha256",
+                               min_length: int = None, mask: str = None):
+    """
+    Фоновая задача для пачки хешей {hash: task_id} с общим пространством
+    (charset и длины или маска): оно перебирается один раз, каждая задача
+    закрывается, как только найден её пароль. Место в очереди пула
+    занимается одно на всю пачку. Задачи можно снять через cancel_job().
+    """
+    pool = get_pool()
+    total = make_keyspace(charset, max_length, min_length, mask).total
+
+    def shards(hashes, slot):
+        return [(brut_force_shard, hashes, charset, max_length, start, stop, slot, hash_type,
+                 min_length, mask)
+                for start, stop in split_keyspace(total, pool.workers)]
+
+    # кеш пустых переборов знает только charset с длинами 1..max_length
+    exhausted = (charset, max_length) if not mask and (min_length or 1) <= 1 else None
+    await _run_job(tasks, total, estimate_seconds(hash_type, total, pool.workers),
+                   shards, exhausted)
+
+
+async def run_wordlist(task_id: int, hash_value: str, path: str, rules,
+                       hash_type: str = "sha256"):
+    """
+    Фоновая задача атаки по словарю. Словарь режется на шарды по байтам,
+    прогресс тоже считается в байтах. Место в очереди пула должно быть
+    заранее занято через try_reserve().
+    """
+    pool = get_pool()
+    try:
+        total = os.path.getsize(path)
+        cost = estimate_seconds(hash_type, estimate_candidates(path, rules), pool.workers)
+    except OSError:
+        # словарь удалили или он не читается после проверки в запросе:
+        # место в очереди возвращаем, задачу закрываем как проваленную
+        pool.unreserve()
+        await _finish_tasks({task_id: None})
+        return
+    except BaseException:
+        pool.unreserve()
+        raise
+
+    def shards(hashes, slot):
+        return [(wordlist_shard, hashes, path, rules, start, stop, slot, hash_type)
+                for start, stop in split_wordlist(path, pool.workers * SHARDS_PER_WORKER)]
+
+    # словарь — не всё пространство, так что ненайденное не запоминаем
+    await _run_job({hash_value: task_id}, total, cost, shards, None)
+
+
+async def _run_job(tasks, total: int, cost: float, make_shards, exhausted):
+    """
+    Ведёт проход по пространству для задач {hash: task_id} отдельной
+    asyncio-задачей, чтобы cancel_job мог её отменить, не задевая задачу,
+    которая обслуживает запрос. make_shards(hashes, slot) строит шарды
+    для _run_shards, exhausted передаётся в _finish_tasks.
+    """
+    job = _Job(tasks.values())
+    for task_id in tasks.values():
+        _jobs[task_id] = job
+    job.runner = asyncio.create_task(_run_batch(job, tasks, total, cost, make_shards, exhausted))
+    try:
+        await asyncio.wait([job.runner])
+    finally:
+        for task_id in tasks.values():
+            _jobs.pop(task_id, None)
+        if job.runner.done() and not job.started:
+            # отменён раньше, чем успел начаться
+            get_pool().unreserve()
+    if not job.cancelled:
+        job.runner.result()
+
+
+async def _run_batch(job: _Job, tasks, total: int, cost: float, make_shards, exhausted):
+    pool = get_pool()
+    # до pool.job() нет ни одного await, так что отмена не проскочит между ними
+    job.started = True
+    async with pool.job(cost) as slot:
+        async with AsyncSessionLocal() as session:
+            for hash_value, task_id in list(tasks.items()):
+                task: Task = await session.get(Task, task_id)
+                if not task or task.status == TaskStatus.cancelled:
+                    del tasks[hash_value]
+                    continue
+
+                # Обновляем статус
+                task.status = TaskStatus.running
+                task.progress = 0
+            await session.commit()
+        if not tasks:
+            return
+
+        async def on_hits(new_hits):
+            for hash_value in new_hits:
+                progress_writer.untrack(tasks[hash_value])
+            await _finish_tasks({tasks[h]: password for h, password in new_hits.items()})
+
+        for task_id in tasks.values():
+            if task_id in job.task_ids:  # снятые, пока ждали слота, не отслеживаем
+                progress_writer.track(task_id, slot, total)
+        try:
+            hits, complete = await _run_shards(pool, slot, total, list(tasks),
+                                               make_shards(list(tasks), slot), on_hits)
+        finally:
+            for task_id in tasks.values():
+                progress_writer.untrack(task_id)
+
+        # Ненайденные помечаем как failed
+        missed = {task_id: None for hash_value, task_id in tasks.items() if hash_value not in hits}
+        if missed:
+            await _finish_tasks(missed, exhausted if complete else None)
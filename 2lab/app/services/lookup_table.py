@@ -0,0 +1,252 @@
+"""
+Предвычисленные таблицы digest -> индекс кандидата для небольших пространств
+(цифры до 8 символов, строчные латинские до 6 и т.п.).
+
+Таблица строится на одну тройку (алгоритм, charset, длина) и хранится
+в файле: заголовок и отсортированные записи фиксированного размера
+(первые 8 байт digest, индекс кандидата в Keyspace). Строится внешней
+сортировкой — кусками в памяти и слиянием на диске. Поиск — бинарный
+по mmap, то есть O(log n) чтений страниц без загрузки файла в память.
+По 8 байтам возможны совпадения, поэтому каждый кандидат перепроверяется
+полным хешем.
+
+Построение (из папки 2lab):
+    python -m app.services.lookup_table build --hash sha256 --charset 0123456789 --lengths 1-8
+Проверка:
+    python -m app.services.lookup_table lookup --hash sha256 --charset 0123456789 --max-length 8 <hex>
+"""
+import argparse
+import asyncio
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import shutil
+import struct
+
+from app.core.config import settings
+from app.services.hash_engine import get_hash, parse_target
+from app.services.keyspace import Keyspace, normalize_charset
+
+MAGIC = b"BFLT"
+PREFIX_BYTES = 8
+RECORD = struct.Struct(">8sQ")  # префикс digest, индекс кандидата
+# кандидатов в одном сортируемом в памяти куске при построении (~80 МБ)
+CHUNK_RECORDS = 1 << 21
+# записей, читаемых и пишущих за раз при слиянии кусков
+MERGE_BLOCK_RECORDS = 1 << 14
+
+_opened = {}  # путь -> LookupTable, таблицы открываются один раз на процесс
+
+
+def table_path(directory: str, hash_type: str, charset: str, length: int) -> str:
+    # charset может содержать что угодно, включая "/", поэтому в имени — его хеш.
+    # Таблица покрывает множество символов, а не их порядок (charset_order
+    # переставляет их), так что хешируем отсортированный набор без повторов;
+    # индексы в таблице — в порядке charset из её заголовка
+    charset_id = hashlib.sha1("".join(sorted(set(charset))).encode()).hexdigest()[:12]
+    return os.path.join(directory, f"{hash_type}_{charset_id}_{length}.tbl")
+
+
+def build_table(hash_type: str, charset: str, length: int, directory: str,
+                chunk_records: int = CHUNK_RECORDS) -> str:
+    """
+    Строит таблицу для кандидатов ровно длины length и возвращает путь к ней.
+
+    Пространство идёт кусками по chunk_records кандидатов: каждый кусок
+    сортируется в памяти и пишется во временный файл, затем файлы
+    сливаются в таблицу k-way merge'ем. Память зависит от chunk_records,
+    а не от размера пространства (цифры длины 8 — это 10^8 записей).
+    """
+    charset = normalize_charset(charset)
+    keyspace = Keyspace(charset, length, length)
+    os.makedirs(directory, exist_ok=True)
+    path = table_path(directory, hash_type, charset, length)
+    tmp_path = path + ".tmp"
+
+    header = json.dumps({
+        "hash_type": hash_type,
+        "charset": charset,
+        "length": length,
+        "count": keyspace.total,
+    }).encode()
+    runs = []
+    try:
+        for start in range(0, keyspace.total, chunk_records):
+            run_path = f"{tmp_path}.{len(runs)}"
+            runs.append(run_path)
+            with open(run_path, "wb") as f:
+                _sorted_chunk(keyspace, hash_type, start, start + chunk_records).tofile(f)
+
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + struct.pack(">I", len(header)) + header)
+            _merge_runs(runs, f)
+        os.replace(tmp_path, path)
+    finally:
+        for run_path in runs + [tmp_path]:
+            if os.path.exists(run_path):
+                os.remove(run_path)
+    return path
+
+
+def _sorted_chunk(keyspace: Keyspace, hash_type: str, start: int, stop: int):
+    """Записи кандидатов [start, stop), отсортированные по префиксу digest."""
+    import numpy as np
+
+    new = get_hash(hash_type)
+    prefixes = bytearray()
+    for candidate in keyspace.candidates(start, stop):
+        prefixes += new(candidate).digest()[:PREFIX_BYTES]
+
+    keys = np.frombuffer(prefixes, dtype=">u8")
+    order = np.argsort(keys, kind="stable")
+    records = np.empty(len(keys), dtype=[("prefix", ">u8"), ("index", ">u8")])
+    records["prefix"] = keys[order]
+    records["index"] = order + start
+    return records
+
+
+def _read_records(path: str):
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(MERGE_BLOCK_RECORDS * RECORD.size)
+            if not block:
+                return
+            for i in range(0, len(block), RECORD.size):
+                yield block[i:i + RECORD.size]
+
+
+def _merge_runs(runs, out):
+    """
+    Сливает отсортированные файлы записей в out. Записи big-endian, так что
+    порядок байтов совпадает с порядком (префикс, индекс) — сравниваем
+    их как bytes, не распаковывая.
+    """
+    if len(runs) == 1:
+        with open(runs[0], "rb") as f:
+            shutil.copyfileobj(f, out, MERGE_BLOCK_RECORDS * RECORD.size)
+        return
+    block = []
+    for record in heapq.merge(*(_read_records(run) for run in runs)):
+        block.append(record)
+        if len(block) == MERGE_BLOCK_RECORDS:
+            out.write(b"".join(block))
+            block = []
+    out.write(b"".join(block))
+
+
+class LookupTable:
+    """Открытая через mmap таблица одной длины."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:4] != MAGIC:
+            raise ValueError(f"{path}: не таблица брутфорса")
+        header_len, = struct.unpack_from(">I", self._mm, 4)
+        header = json.loads(self._mm[8:8 + header_len])
+        self.hash_type = header["hash_type"]
+        self.keyspace = Keyspace(header["charset"], header["length"], header["length"])
+        self.count = header["count"]
+        self._offset = 8 + header_len
+
+    def _prefix_at(self, i: int) -> bytes:
+        start = self._offset + i * RECORD.size
+        return self._mm[start:start + PREFIX_BYTES]
+
+    def find(self, digest: bytes):
+        """Пароль (bytes) с таким digest или None."""
+        key = digest[:PREFIX_BYTES]
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._prefix_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        new = get_hash(self.hash_type)
+        # одинаковых префиксов может быть несколько — проверяем все
+        while lo < self.count:
+            prefix, index = RECORD.unpack_from(self._mm, self._offset + lo * RECORD.size)
+            if prefix != key:
+                break
+            candidate = self.keyspace.candidate_at(index)
+            if new(candidate).digest() == digest:
+                return candidate
+            lo += 1
+        return None
+
+
+def open_table(directory: str, hash_type: str, charset: str, length: int):
+    path = table_path(directory, hash_type, charset, length)
+    if path not in _opened:
+        if not os.path.exists(path):
+            return None
+        _opened[path] = LookupTable(path)
+    return _opened[path]
+
+
+def lookup(hash_type: str, charset: str, max_length: int, digest: bytes,
+           directory: str = None):
+    """
+    Ищет digest по таблицам длин 1..max_length.
+    Возвращает (пароль или None, покрыты ли таблицами все длины). Если все
+    длины покрыты и пароль не найден, перебирать пространство бессмысленно.
+    """
+    directory = directory or settings.BRUT_TABLES_DIR
+    covered = True
+    for length in range(1, max_length + 1):
+        table = open_table(directory, hash_type, charset, length)
+        if table is None:
+            covered = False
+            continue
+        password = table.find(digest)
+        if password is not None:
+            return password.decode(), True
+    return None, covered
+
+
+async def lookup_async(hash_type: str, charset: str, max_length: int, digest: bytes,
+                       directory: str = None):
+    """lookup() в потоке: чтения страниц mmap и перепроверка хешем не держат event loop."""
+    return await asyncio.to_thread(lookup, hash_type, charset, max_length, digest, directory)
+
+
+def _parse_lengths(value: str):
+    first, _, last = value.partition("-")
+    return range(int(first), int(last or first) + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Таблицы digest -> пароль для небольших пространств")
+    parser.add_argument("--dir", default=settings.BRUT_TABLES_DIR,
+                        help=f"Папка с таблицами (по умолчанию {settings.BRUT_TABLES_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Построить таблицы")
+    build.add_argument("--hash", default="sha256", help="Алгоритм (по умолчанию sha256)")
+    build.add_argument("--charset", required=True)
+    build.add_argument("--lengths", required=True, help="Длина или диапазон, например 1-6")
+
+    find = commands.add_parser("lookup", help="Найти пароль по хешу")
+    find.add_argument("--hash", default="sha256", help="Алгоритм (по умолчанию sha256)")
+    find.add_argument("--charset", required=True)
+    find.add_argument("--max-length", type=int, required=True)
+    find.add_argument("digest", help="Хеш в hex")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        for length in _parse_lengths(args.lengths):
+            print(f"Длина {length}: {build_table(args.hash, args.charset, length, args.dir)}")
+    else:
+        password, covered = lookup(args.hash, args.charset, args.max_length,
+                                   parse_target(args.hash, args.digest), args.dir)
+        if password is not None:
+            print(password)
+        else:
+            print("Не найден" + ("" if covered else " (не все длины покрыты таблицами)"))
+
+
+if __name__ == "__main__":
+    main()
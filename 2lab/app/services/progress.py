@@ -0,0 +1,77 @@
+import asyncio
+import logging
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.tasks import Task, TaskStatus
+from app.services.worker_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressWriter:
+    """
+    Периодически переносит прогресс запущенных задач из общей памяти пула
+    в таблицу tasks. Все изменившиеся задачи пишутся одной транзакцией
+    не чаще, чем раз в interval_ms, — SQLite не дёргается на каждый шард.
+    """
+
+    def __init__(self, interval_ms: int):
+        self.interval = interval_ms / 1000
+        self._tracked = {}  # task_id -> (slot, total)
+        self._written = {}  # task_id -> последний записанный процент
+        self._task = None
+
+    def track(self, task_id: int, slot: int, total: int):
+        self._tracked[task_id] = (slot, total)
+        self._written[task_id] = 0
+
+    def untrack(self, task_id: int):
+        self._tracked.pop(task_id, None)
+        self._written.pop(task_id, None)
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Не удалось записать прогресс задач")
+
+    async def flush(self):
+        pool = get_pool()
+        updates = {}
+        for task_id, (slot, total) in list(self._tracked.items()):
+            # 100 пишет только сама задача вместе с итоговым статусом
+            percent = min(99, pool.progress(slot) * 100 // total) if total else 0
+            if percent != self._written.get(task_id):
+                updates[task_id] = percent
+        if not updates:
+            return
+
+        async with AsyncSessionLocal() as session:
+            for task_id, percent in updates.items():
+                # итоговый статус мог записаться раньше — его не перетираем
+                await session.execute(
+                    update(Task)
+                    .where(Task.id == task_id, Task.status == TaskStatus.running)
+                    .values(progress=percent)
+                )
+            await session.commit()
+        for task_id, percent in updates.items():
+            if task_id in self._tracked:
+                self._written[task_id] = percent
+
+
+progress_writer = ProgressWriter(settings.BRUT_PROGRESS_INTERVAL_MS)
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.cruds.cracked import get_cracked, save_cracked
+from app.cruds.exhausted import add_exhausted, list_exhausted
+
+
+class LRUCache:
+    """Простой LRU-словарь фиксированного размера."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key):
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class ResultCache:
+    """
+    Кеш уже взломанных хешей: таблица cracked_hashes, перед ней LRU в памяти.
+    Ключ — (алгоритм, digest в hex нижнего регистра).
+    """
+
+    def __init__(self, maxsize: int):
+        self._lru = LRUCache(maxsize)
+
+    async def lookup(self, db: AsyncSession, hash_type: str, digest: str):
+        """Пароль для хеша или None, если он ещё не взломан."""
+        key = (hash_type, digest)
+        password = self._lru.get(key)
+        if password is None:
+            cracked = await get_cracked(db, hash_type, digest)
+            if cracked is not None:
+                password = cracked.password
+                self._lru.put(key, password)
+        return password
+
+    async def remember(self, db: AsyncSession, hash_type: str, digest: str, password: str):
+        """Сохраняет находку в рамках транзакции db (commit — на вызывающем)."""
+        await save_cracked(db, hash_type, digest, password)
+        self._lru.put((hash_type, digest), password)
+
+
+class ExhaustedCache:
+    """
+    Кеш безрезультатных переборов. Полный перебор charset C до длины L
+    отвечает и на любой запрос с charset из подмножества C и длиной <= L.
+    """
+
+    @staticmethod
+    def normalize(charset: str) -> str:
+        return "".join(sorted(set(charset)))
+
+    async def covers(self, db: AsyncSession, hash_type: str, digest: str,
+                     charset: str, max_length: int) -> bool:
+        """True, если такое пространство (или более широкое) уже перебрано."""
+        wanted = set(charset)
+        for searched in await list_exhausted(db, hash_type, digest):
+            if max_length <= searched.max_length and wanted <= set(searched.charset):
+                return True
+        return False
+
+    async def remember(self, db: AsyncSession, hash_type: str, digest: str,
+                       charset: str, max_length: int):
+        """Сохраняет перебор в рамках транзакции db (commit — на вызывающем)."""
+        if not await self.covers(db, hash_type, digest, charset, max_length):
+            add_exhausted(db, hash_type, digest, self.normalize(charset), max_length)
+
+
+result_cache = ResultCache(settings.BRUT_CACHE_SIZE)
+exhausted_cache = ExhaustedCache()
@@ -0,0 +1,147 @@
+"""
+Атака по словарю: слова читаются из файла через mmap построчно, и файл
+не загружается в память целиком — годятся и словари на гигабайты.
+
+Шардирование — по смещению в байтах: split_wordlist режет файл на
+диапазоны и сдвигает границы к началу строки. Строка принадлежит тому
+шарду, в котором начинается, поэтому шард, дошедший до конца, прочитал
+ровно stop - start байт — прогресс и полноту перебора можно считать
+в байтах.
+
+Правила (RULES) дают из слова дополнительные варианты, каждое правило —
+независимо от остальных:
+    case   — нижний, верхний регистр, с заглавной, инвертированный;
+    digits — суффиксы 0-9 и 00-99;
+    leet   — замена букв похожими цифрами и знаками (a -> 4, s -> 5, ...).
+Регистр меняется только у ASCII-букв.
+"""
+import mmap
+import os
+
+from app.services.hash_engine import CHECK_EVERY, get_hash
+
+# средняя длина строки словаря с переводом строки — для оценки числа слов
+AVG_LINE_BYTES = 9
+
+_SUFFIXES = [str(i).encode() for i in range(10)] + [f"{i:02d}".encode() for i in range(100)]
+_LEET = bytes.maketrans(b"aAeEiIoOsStTbBgG", b"4433110055778899")
+
+
+def _case(word: bytes):
+    return word.lower(), word.upper(), word.capitalize(), word.swapcase()
+
+
+def _digits(word: bytes):
+    return [word + suffix for suffix in _SUFFIXES]
+
+
+def _leet(word: bytes):
+    return (word.translate(_LEET),)
+
+
+RULES = {
+    "case": (_case, 4),
+    "digits": (_digits, len(_SUFFIXES)),
+    "leet": (_leet, 1),
+}
+
+
+def check_rules(rules):
+    """Валидатор для схем запросов: список имён правил из RULES или ValueError."""
+    unknown = [rule for rule in rules if rule not in RULES]
+    if unknown:
+        raise ValueError(f"Неизвестные правила: {', '.join(unknown)}; "
+                         f"доступны: {', '.join(RULES)}")
+    return list(dict.fromkeys(rules))
+
+
+def variants_per_word(rules) -> int:
+    """Сколько кандидатов максимум даёт одно слово при этих правилах."""
+    return 1 + sum(RULES[rule][1] for rule in rules)
+
+
+def estimate_candidates(path: str, rules) -> int:
+    """Грубая оценка числа кандидатов для словаря — по размеру файла."""
+    return max(1, os.path.getsize(path) // AVG_LINE_BYTES) * variants_per_word(rules)
+
+
+def mangle(word: bytes, rules):
+    """Слово и его варианты по правилам, без повторов."""
+    seen = {word}
+    yield word
+    for rule in rules:
+        for variant in RULES[rule][0](word):
+            if variant not in seen:
+                seen.add(variant)
+                yield variant
+
+
+def split_wordlist(path: str, parts: int):
+    """Режет файл на не больше parts диапазонов байт, границы — по началам строк."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    step = -(-size // parts)
+    bounds = [0]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for offset in range(step, size, step):
+            # начало первой строки, начинающейся не раньше offset
+            newline = mm.find(b"\n", offset - 1)
+            bound = size if newline == -1 else newline + 1
+            if bound > bounds[-1] and bound < size:
+                bounds.append(bound)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def iter_lines(mm, start: int, stop: int):
+    """Строки (без перевода строки), начинающиеся в [start, stop), и позиция за каждой."""
+    mm.seek(start)
+    readline = mm.readline
+    while mm.tell() < stop:
+        line = readline()
+        yield line.rstrip(b"\r\n"), mm.tell()
+
+
+def search_wordlist(path: str, hash_type: str, targets, start: int = 0, stop: int = None,
+                    rules=(), on_hit=None, on_progress=None, check_every: int = CHECK_EVERY):
+    """
+    Ищет цели (digest в bytes) среди слов, начинающихся в [start, stop)
+    байт файла, и их вариантов по rules. on_hit и on_progress — как у
+    search_many, только on_progress получает число прочитанных байт.
+    Возвращает ({digest: пароль в bytes}, сколько байт прочитано).
+    """
+    pending = set(targets)
+    hits = {}
+    size = os.path.getsize(path)
+    stop = size if stop is None else min(stop, size)
+    if not pending or start >= stop:
+        return hits, 0
+
+    new = get_hash(hash_type)
+    position = reported = start
+    hashed = 0  # кандидатов с прошлого вызова on_progress: у слова их может быть сотня
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for word, position in iter_lines(mm, start, stop):
+            if not word:
+                continue
+            for candidate in mangle(word, rules) if rules else (word,):
+                hashed += 1
+                digest = new(candidate).digest()
+                if digest in pending:
+                    hits[digest] = candidate
+                    pending.discard(digest)
+                    if on_hit is not None:
+                        on_hit(digest, candidate)
+            if not pending:
+                break
+            if on_progress is not None and hashed >= check_every:
+                stop_requested = on_progress(position - reported)
+                reported = position
+                hashed = 0
+                if stop_requested:
+                    break
+
+    if on_progress is not None and position > reported:
+        on_progress(position - reported)
+    return hits, position - start
@@ -0,0 +1,159 @@
+import asyncio
+import heapq
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+
+# Флаги отмены и счётчики перебранных кандидатов по слотам задач.
+# В процессах пула выставляются initializer'ом, так что и проверка флага,
+# и отчёт о прогрессе — работа с общей памятью без IPC.
+_cancel_flags = None
+_progress = None
+
+
+def _init_worker(cancel_flags, progress):
+    global _cancel_flags, _progress
+    _cancel_flags = cancel_flags
+    _progress = progress
+
+
+def cancel_requested(slot) -> bool:
+    return slot is not None and _cancel_flags is not None and bool(_cancel_flags[slot])
+
+
+def report_progress(slot, processed: int):
+    """Прибавляет processed к счётчику слота (вызывается из воркеров)."""
+    if slot is None or _progress is None:
+        return
+    with _progress.get_lock():
+        _progress[slot] += processed
+
+
+class BrutForcePool:
+    """
+    Общий на всё приложение пул процессов для брутфорса.
+
+    Одновременно перебирается не больше max_jobs задач (у каждой свой слот
+    с флагом отмены), ещё queue_size ждут своей очереди. Всё, что сверху,
+    отклоняется через try_reserve(). Из очереди первой берётся задача
+    с наименьшей оценкой времени (cost), при равных — пришедшая раньше.
+    """
+
+    def __init__(self, workers: int, max_jobs: int, queue_size: int):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_jobs = max(1, max_jobs)
+        self.queue_size = max(0, queue_size)
+        self.executor = None
+        self._cancel_flags = None
+        self._progress = None
+        self._free_slots = []
+        self._waiting = []  # куча (cost, порядковый номер, future со слотом)
+        self._order = itertools.count()
+        self._reserved = 0
+
+    def start(self):
+        self._cancel_flags = multiprocessing.Array('b', self.max_jobs, lock=False)
+        # счётчики прогресса увеличивают сразу несколько процессов — нужен lock
+        self._progress = multiprocessing.Array('q', self.max_jobs)
+        _init_worker(self._cancel_flags, self._progress)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            initializer=_init_worker,
+                                            initargs=(self._cancel_flags, self._progress))
+        self._free_slots = list(range(self.max_jobs))
+
+    def shutdown(self):
+        if self.executor is None:
+            return
+        for slot in range(self.max_jobs):
+            self._cancel_flags[slot] = 1
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.executor = None
+
+    @property
+    def saturated(self) -> bool:
+        return self._reserved >= self.max_jobs + self.queue_size
+
+    def try_reserve(self) -> bool:
+        """Занимает место в очереди; False, если пул перегружен."""
+        if self.saturated:
+            return False
+        self._reserved += 1
+        return True
+
+    def unreserve(self):
+        """Возвращает место, занятое try_reserve(), если задача не дошла до job()."""
+        self._reserved -= 1
+
+    @asynccontextmanager
+    async def job(self, cost: float = 0):
+        """
+        Ждёт свободный слот для зарезервированной задачи и отдаёт его номер;
+        cost — оценка длительности задачи, короткие задачи идут первыми.
+        На выходе слот и место в очереди освобождаются.
+        """
+        try:
+            slot = await self._acquire(cost)
+            try:
+                yield slot
+            finally:
+                self._release(slot)
+        finally:
+            self._reserved -= 1
+
+    async def _acquire(self, cost: float) -> int:
+        if self._free_slots and not self._waiting:
+            return self._take_slot()
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (cost, next(self._order), waiter))
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            # слот мог достаться нам одновременно с отменой — возвращаем его
+            if waiter.done() and not waiter.cancelled():
+                self._release(waiter.result())
+            raise
+
+    def _take_slot(self) -> int:
+        slot = self._free_slots.pop()
+        self._cancel_flags[slot] = 0
+        self._progress[slot] = 0
+        return slot
+
+    def _release(self, slot: int):
+        self._free_slots.append(slot)
+        while self._waiting and self._free_slots:
+            _, _, waiter = heapq.heappop(self._waiting)
+            if not waiter.done():  # отменённые ожидания пропускаем
+                waiter.set_result(self._take_slot())
+
+    def cancel(self, slot: int):
+        self._cancel_flags[slot] = 1
+
+    def progress(self, slot: int) -> int:
+        """Сколько кандидатов уже перебрано задачей в этом слоте."""
+        return self._progress[slot]
+
+
+pool = None
+
+
+def start_pool():
+    global pool
+    pool = BrutForcePool(settings.BRUT_WORKERS, settings.BRUT_MAX_JOBS,
+                         settings.BRUT_QUEUE_SIZE)
+    pool.start()
+
+
+def stop_pool():
+    if pool is not None:
+        pool.shutdown()
+
+
+def get_pool() -> BrutForcePool:
+    if pool is None:
+        raise RuntimeError("Пул брутфорса не запущен")
+    return pool
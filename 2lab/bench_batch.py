@@ -0,0 +1,76 @@
+# Бенчмарк пакетной генерации кандидатов (Keyspace.batches, numpy) против
+# itertools.product: сколько кандидатов в секунду даёт сама генерация и
+# генерация вместе с хешированием.
+# Запуск из папки 2lab: python bench_batch.py
+import hashlib
+import itertools
+import time
+
+from app.services.hash_engine import get_hash, search
+from app.services.keyspace import Keyspace
+
+CHARSET = "abcdefghijklmnopqrstuvwxyz0123456789"
+LENGTH = 4
+HASH_TYPE = "md5"
+
+
+def product_generate():
+    for candidate in itertools.product(CHARSET, repeat=LENGTH):
+        "".join(candidate).encode()
+
+
+def batch_generate():
+    for _ in Keyspace(CHARSET, LENGTH, LENGTH).batches():
+        pass
+
+
+def product_search():
+    # так перебор был устроен изначально
+    target = "0" * (hashlib.new(HASH_TYPE).digest_size * 2)
+    for candidate in itertools.product(CHARSET, repeat=LENGTH):
+        if getattr(hashlib, HASH_TYPE)("".join(candidate).encode()).hexdigest() == target:
+            return candidate
+
+
+def keyspace_search():
+    target = bytes(hashlib.new(HASH_TYPE).digest_size)
+    return search(Keyspace(CHARSET, LENGTH, LENGTH), HASH_TYPE, target)
+
+
+def batch_search():
+    # пачки из batches() с хешированием по строке — движок так не ищет,
+    # потому что на hashlib это не быстрее search
+    new = get_hash(HASH_TYPE)
+    target = bytes(new().digest_size)
+    for _, batch in Keyspace(CHARSET, LENGTH, LENGTH).batches():
+        data = batch.tobytes()
+        step = batch.shape[1]
+        for i in range(0, len(data), step):
+            if new(data[i:i + step]).digest() == target:
+                return data[i:i + step]
+
+
+def guesses_per_second(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return len(CHARSET) ** LENGTH / best
+
+
+def main():
+    print(f"{len(CHARSET) ** LENGTH} кандидатов, charset={len(CHARSET)}, длина={LENGTH}, {HASH_TYPE}")
+    print(f"{'режим':<28}{'кандидатов/с':>16}")
+    for name, fn in (
+        ("генерация: product", product_generate),
+        ("генерация: batches", batch_generate),
+        ("перебор: product+hexdigest", product_search),
+        ("перебор: search", keyspace_search),
+        ("перебор: batches+hashlib", batch_search),
+    ):
+        print(f"{name:<28}{guesses_per_second(fn):>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
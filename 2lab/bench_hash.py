@@ -0,0 +1,58 @@
+# Микро-бенчмарк горячего цикла брутфорса: сколько стоит одна попытка
+# при сравнении hexdigest-строк, при сравнении сырых digest и в режиме
+# prefix_states (префикс хешируется один раз, дальше .copy()).
+# Запуск из папки 2lab: python bench_hash.py
+import hashlib
+import itertools
+import time
+
+from app.services.hash_engine import search
+from app.services.keyspace import Keyspace
+
+CHARSET = "abcdefghijklmnopqrstuvwxyz"
+LENGTH = 4
+ALGORITHMS = ("md5", "sha1", "sha256")
+
+
+def hexdigest_loop(hash_type: str):
+    # так перебор был устроен раньше: join + encode + hexdigest на каждую попытку
+    algo = getattr(hashlib, hash_type)
+    target = "0" * (algo().digest_size * 2)
+    for candidate in itertools.product(CHARSET, repeat=LENGTH):
+        if algo("".join(candidate).encode()).hexdigest() == target:
+            return candidate
+
+
+def digest_loop(hash_type: str, prefix_states: bool = False):
+    keyspace = Keyspace(CHARSET, LENGTH, LENGTH)
+    target = bytes(getattr(hashlib, hash_type)().digest_size)
+    return search(keyspace, hash_type, target, prefix_states=prefix_states)
+
+
+def prefix_loop(hash_type: str):
+    return digest_loop(hash_type, prefix_states=True)
+
+
+def ns_per_candidate(fn, hash_type: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(hash_type)
+        best = min(best, time.perf_counter() - started)
+    return best / len(CHARSET) ** LENGTH * 1e9
+
+
+def main():
+    print(f"{len(CHARSET) ** LENGTH} кандидатов, charset={len(CHARSET)}, длина={LENGTH}")
+    print(f"{'алгоритм':<10}{'hexdigest, нс':>16}{'digest, нс':>14}{'prefix, нс':>14}"
+          f"{'ускорение':>12}")
+    for hash_type in ALGORITHMS:
+        old = ns_per_candidate(hexdigest_loop, hash_type)
+        new = ns_per_candidate(digest_loop, hash_type)
+        prefix = ns_per_candidate(prefix_loop, hash_type)
+        print(f"{hash_type:<10}{old:>16.0f}{new:>14.0f}{prefix:>14.0f}"
+              f"{old / min(new, prefix):>11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,31 @@ from app.api import auth, brut_force
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
+from app.services.brut_force import cancel_orphaned_tasks
+from app.services.hash_engine import measure_rates
+from app.services.progress import progress_writer
+from app.services.worker_pool import start_pool, stop_pool
 
 app = FastAPI()
 
+
+@app.on_event("startup")
+async def startup():
+    # задачи, прерванные прошлым запуском, больше никто не переберёт
+    await cancel_orphaned_tasks()
+    # один пул процессов на всё приложение, а не на каждый запрос
+    start_pool()
+    progress_writer.start()
+    # скорость перебора по алгоритмам — для оценки длительности задач
+    measure_rates()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await progress_writer.stop()
+    stop_pool()
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     # Преобразуем стандартные ошибки в более читаемый формат
@@ -0,0 +1,35 @@
+import hashlib
+import itertools
+
+import pytest
+
+from app.services.hash_engine import search
+from app.services.keyspace import Keyspace
+
+# кириллица (2 байта), цифры и латиница (1 байт), знак евро (3 байта)
+MIXED = "аб1z€"
+
+
+def product(charset, min_length, max_length):
+    # так кандидаты перебирались до Keyspace
+    return [("".join(chars)).encode()
+            for length in range(min_length, max_length + 1)
+            for chars in itertools.product(charset, repeat=length)]
+
+
+def test_mixed_width_candidates():
+    keyspace = Keyspace(MIXED, 3)
+    expected = product(MIXED, 1, 3)
+    assert keyspace.width is None
+    assert [bytes(c) for c in keyspace.candidates()] == expected
+    assert [bytes(c) for c in keyspace.candidates(7, 40)] == expected[7:40]
+    assert [keyspace.candidate_at(i) for i in range(len(expected))] == expected
+
+
+@pytest.mark.parametrize("prefix_states", [True, False])
+def test_mixed_width_search(prefix_states):
+    keyspace = Keyspace(MIXED, 3)
+    password = "б€1".encode()
+    found, _ = search(keyspace, "md5", hashlib.md5(password).digest(),
+                      prefix_states=prefix_states)
+    assert found == password
@@ -0,0 +1,28 @@
+import hashlib
+
+import pytest
+
+from app.services.keyspace import normalize_charset
+from app.services.lookup_table import build_table, lookup
+
+
+def test_lookup_ignores_charset_order(tmp_path):
+    for length in (1, 2, 3):
+        build_table("md5", "0123456789", length, str(tmp_path))
+    frequency = normalize_charset("0123456789", "frequency")
+    assert frequency != "0123456789"
+
+    digest = hashlib.md5(b"42").digest()
+    assert lookup("md5", frequency, 3, digest, str(tmp_path)) == ("42", True)
+    assert lookup("md5", "9876543210", 3, digest, str(tmp_path)) == ("42", True)
+
+
+@pytest.mark.parametrize("chunk_records", [7, 1 << 21])
+def test_chunked_build(tmp_path, chunk_records):
+    # символы разной ширины в UTF-8, куски меньше пространства и больше него
+    for length in (1, 2, 3, 4):
+        build_table("sha1", "ab€", length, str(tmp_path), chunk_records=chunk_records)
+    found = lookup("sha1", "ab€", 4, hashlib.sha1("b€ab".encode()).digest(), str(tmp_path))
+    assert found == ("b€ab", True)
+    missing = lookup("sha1", "ab€", 4, hashlib.sha1(b"c").digest(), str(tmp_path))
+    assert missing == (None, True)
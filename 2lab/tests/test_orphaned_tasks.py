@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.models.tasks import Task, TaskStatus
+from app.services.brut_force import cancel_orphaned_tasks
+
+
+async def run_startup(statuses):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add_all(Task(hash_value="00", charset="0", max_length=1, status=status)
+                        for status in statuses)
+        await session.commit()
+
+    cancelled = await cancel_orphaned_tasks(factory)
+    async with factory() as session:
+        tasks = (await session.execute(Task.__table__.select().order_by(Task.id))).all()
+    await engine.dispose()
+    return cancelled, [task.status for task in tasks]
+
+
+def test_running_tasks_are_cancelled_on_startup():
+    # running после перезапуска — это задачи, которые уже никто не перебирает
+    cancelled, statuses = asyncio.run(run_startup(
+        [TaskStatus.running, TaskStatus.completed, TaskStatus.running, TaskStatus.failed]))
+    assert cancelled == 2
+    assert statuses == [TaskStatus.cancelled, TaskStatus.completed,
+                        TaskStatus.cancelled, TaskStatus.failed]
@@ -0,0 +1,11 @@
+from app.services.wordlist import mangle
+
+
+def test_leet_table():
+    # стандартные замены leetspeak, как в правилах hashcat: b -> 8, а не 1
+    source = b"aAeEiIoOsStTbBgG"
+    assert list(mangle(source, ["leet"]))[1] == b"4433110055778899"
+
+
+def test_leet_keeps_other_bytes():
+    assert list(mangle(b"Bob_42", ["leet"])) == [b"Bob_42", b"808_42"]
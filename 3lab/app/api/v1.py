@@ -1,30 +1,188 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
 import string
+import uuid
 from app.websocket.manager import manager
-from app.celery.tasks import bruteforce_task
+from app.celery.tasks import (bruteforce_task, bruteforce_batch_task,
+                              bruteforce_coordinator_task, is_cancelled, load_hash_rates,
+                              owns_task, publish_status, release_budget, request_cancel,
+                              reserve_budget, user_load)
+from app.core.celery_app import route_by_cost
+from app.core.settings import get_settings
+from app.services.hash_engine import check_hash_type, estimate_seconds, parse_target
+from app.services.keyspace import Keyspace, make_keyspace, normalize_charset
+from app.services.result_cache import exhausted_cache, result_cache
+from app.api.deps import DBSession
 
 router = APIRouter(prefix="/api/v1")
 
-from pydantic import BaseModel
+
+def estimate_job(hash_type: str, keyspace: Keyspace, processes: int = 1) -> float:
+    # скорость — замеренная воркерами при старте (см. record_hash_rates)
+    return estimate_seconds(hash_type, keyspace.total, processes, load_hash_rates())
+
+
+def check_budget(user_id: int, seconds: float):
+    """400 для слишком долгой задачи, 429 — если не хватает бюджета пользователя."""
+    settings = get_settings()
+    if seconds > settings.max_job_seconds:
+        raise HTTPException(status_code=400,
+                            detail=f"Estimated {seconds:.0f}s exceeds the {settings.max_job_seconds:.0f}s "
+                                   f"limit, reduce charset or max_length")
+    load = user_load(user_id)
+    over = load + seconds - settings.user_budget_seconds
+    if over > 0:
+        raise HTTPException(status_code=429,
+                            detail=f"Budget exceeded: {load:.0f}s of work already queued, "
+                                   f"limit is {settings.user_budget_seconds:.0f}s",
+                            headers={"Retry-After": str(int(over) + 1)})
+
+from typing import Optional
+from pydantic import BaseModel, field_validator, model_validator
 
 class BruteforceRequest(BaseModel):
     user_id: int
     target_hash: str
     charset: str = "abcdefghijklmnopqrstuvwxyz0123456789"
+    charset_order: str = "given"  # given или frequency — частые в паролях символы первыми
     max_length: int = 8
+    min_length: Optional[int] = None  # по умолчанию 1, для маски — её полная длина
+    mask: Optional[str] = None  # ?l?u?d?h?H?s?a, как в hashcat; тогда charset не нужен
     hash_type: str = "md5"
 
+    @field_validator("hash_type")
+    @classmethod
+    def validate_hash_type(cls, value: str) -> str:
+        return check_hash_type(value)
+
+    @model_validator(mode="after")
+    def validate_charset(self):
+        # повторы в charset только раздували бы пространство дублями
+        self.charset = normalize_charset(self.charset, self.charset_order)
+        if not self.mask and (not self.charset or self.max_length < 1):
+            raise ValueError("Без mask нужны непустой charset и max_length не меньше 1")
+        return self
+
 
 @router.post("/bruteforce")
-async def start_bruteforce(data: BruteforceRequest):
-    task = bruteforce_task.delay(
+async def start_bruteforce(data: BruteforceRequest, db: DBSession):
+    try:
+        keyspace = make_keyspace(data.charset, data.max_length, data.min_length, data.mask)
+        # иначе пространство пустое и задача зря займёт воркер ради "не найден"
+        if keyspace.min_length > keyspace.max_length:
+            raise ValueError("min_length больше длины пароля")
+        digest = parse_target(data.hash_type, data.target_hash).hex()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # уже взломанный хеш отдаём сразу, без постановки в очередь
+    password = await result_cache.lookup(db, data.hash_type, digest)
+    if password is not None:
+        return {"task_id": None, "status": "COMPLETED", "result": password, "cached": True}
+    # такое (или более широкое) пространство уже перебрано впустую;
+    # кеш знает только charset, маски в нём не бывает
+    if not data.mask and await exhausted_cache.covers(db, data.hash_type, digest,
+                                                      data.charset, data.max_length):
+        return {"task_id": None, "status": "FAILED", "message": "Password not found",
+                "cached": True}
+
+    # большое пространство режем на куски для всех воркеров, маленькое
+    # быстрее перебрать одной задачей
+    settings = get_settings()
+    if keyspace.total > settings.bruteforce_chunk_size:
+        job, processes = bruteforce_coordinator_task, settings.worker_processes
+    else:
+        job, processes = bruteforce_task, 1
+    estimated = estimate_job(data.hash_type, keyspace, processes)
+    check_budget(data.user_id, estimated)
+
+    task_id = str(uuid.uuid4())
+    reserve_budget(data.user_id, task_id, estimated)
+    task = job.apply_async((
         data.user_id,
         data.target_hash,
         data.charset,
-        data.max_length,
-        data.hash_type
-    )
-    return {"task_id": task.id, "status": "ENQUEUED"}
+        keyspace.max_length,
+        data.hash_type,
+        keyspace.min_length,
+        data.mask
+    ), task_id=task_id, **route_by_cost(estimated))
+    return {"task_id": task.id, "status": "ENQUEUED", "estimated_seconds": estimated,
+            "keyspace_size": keyspace.total}
+
+
+class BruteforceBatchRequest(BaseModel):
+    user_id: int
+    target_hashes: list[str]
+    charset: str = "abcdefghijklmnopqrstuvwxyz0123456789"
+    charset_order: str = "given"  # given или frequency — частые в паролях символы первыми
+    max_length: int = 8
+    min_length: Optional[int] = None  # по умолчанию 1, для маски — её полная длина
+    mask: Optional[str] = None  # ?l?u?d?h?H?s?a, как в hashcat; тогда charset не нужен
+    hash_type: str = "md5"
+
+    @field_validator("hash_type")
+    @classmethod
+    def validate_hash_type(cls, value: str) -> str:
+        return check_hash_type(value)
+
+    @model_validator(mode="after")
+    def validate_charset(self):
+        # повторы в charset только раздували бы пространство дублями
+        self.charset = normalize_charset(self.charset, self.charset_order)
+        if not self.mask and (not self.charset or self.max_length < 1):
+            raise ValueError("Без mask нужны непустой charset и max_length не меньше 1")
+        return self
+
+
+@router.post("/bruteforce/batch")
+async def start_bruteforce_batch(data: BruteforceBatchRequest, db: DBSession):
+    """Все хеши перебираются за один проход; находки приходят в WebSocket по мере появления."""
+    if not data.target_hashes:
+        raise HTTPException(status_code=400, detail="target_hashes is empty")
+    try:
+        keyspace = make_keyspace(data.charset, data.max_length, data.min_length, data.mask)
+        # иначе пространство пустое и задача зря займёт воркер ради "не найден"
+        if keyspace.min_length > keyspace.max_length:
+            raise ValueError("min_length больше длины пароля")
+        # одинаковые хеши (в том числе в разном регистре) схлопываем
+        hashes = list(dict.fromkeys(
+            parse_target(data.hash_type, h).hex() for h in data.target_hashes
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # уже взломанные хеши отвечаем сразу, перебираем только остальные
+    cached = {}
+    hopeless = []
+    for h in hashes:
+        password = await result_cache.lookup(db, data.hash_type, h)
+        if password is not None:
+            cached[h] = password
+        elif not data.mask and await exhausted_cache.covers(db, data.hash_type, h,
+                                                            data.charset, data.max_length):
+            hopeless.append(h)
+    hashes = [h for h in hashes if h not in cached and h not in hopeless]
+    if not hashes:
+        return {"task_id": None, "status": "COMPLETED", "hashes": 0,
+                "cached": cached, "not_found": hopeless}
+
+    estimated = estimate_job(data.hash_type, keyspace)
+    check_budget(data.user_id, estimated)
+
+    task_id = str(uuid.uuid4())
+    reserve_budget(data.user_id, task_id, estimated)
+    task = bruteforce_batch_task.apply_async((
+        data.user_id,
+        hashes,
+        data.charset,
+        keyspace.max_length,
+        data.hash_type,
+        keyspace.min_length,
+        data.mask
+    ), task_id=task_id, **route_by_cost(estimated))
+    return {"task_id": task.id, "status": "ENQUEUED", "hashes": len(hashes),
+            "cached": cached, "not_found": hopeless, "estimated_seconds": estimated,
+            "keyspace_size": keyspace.total}
 
 # app/api/v1/routes.py
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
@@ -60,6 +218,8 @@ from fastapi import HTTPException
 
 @router.get("/bruteforce/{task_id}")
 async def get_task_status(task_id: str):
+    if is_cancelled(task_id):
+        return {"status": "CANCELLED"}
     result = AsyncResult(task_id)
     if result.state == "PENDING":
         return {"status": "PENDING"}
@@ -71,3 +231,17 @@ async def get_task_status(task_id: str):
         return {"status": "FAILURE", "error": str(result.result)}
     else:
         return {"status": result.state}
+
+
+@router.delete("/bruteforce/{task_id}")
+async def cancel_task(task_id: str, user_id: int):
+    """
+    Отменяет незавершённую задачу пользователя. Воркеры останавливаются на
+    ближайшей проверке флага отмены, ещё не начатые куски — сразу при старте.
+    """
+    if not owns_task(user_id, task_id):
+        raise HTTPException(status_code=404, detail="No running task with this id")
+    request_cancel(task_id)
+    release_budget(user_id, task_id)
+    publish_status(user_id, {"status": "CANCELLED", "task_id": task_id})
+    return {"task_id": task_id, "status": "CANCELLED"}
@@ -1,44 +1,301 @@
 # app/celery/tasks.py
-import itertools, time, hashlib, json
+import time, json
 from datetime import timedelta
-from celery import Celery
+from celery import Celery, chord, group
+from celery.signals import worker_ready
 import redis
 
 from app.core.celery_app import celery
+from app.core.settings import get_settings
+from app.services.hash_engine import measure_rates, parse_target, search, search_many
+from app.services.keyspace import Keyspace, make_keyspace
+from app.services.result_cache import exhausted_cache, result_cache
 
 # создаём синхронный клиент Redis — он используется только внутри Celery
 redis_client = redis.Redis(host="localhost", port=6380, db=0)
 
+settings = get_settings()
+
 def publish_status(user_id: int, message: dict):
     channel = f"ws_{user_id}"
     redis_client.publish(channel, json.dumps(message))
 
-@celery.task(bind=True)
+
+# Скорость перебора (кандидатов/с на процесс) по алгоритмам. Меряется
+# воркером при старте и лежит в Redis, чтобы API мог оценить длительность
+# задачи по скорости настоящих воркеров, а не своей.
+HASH_RATES_KEY = "bruteforce_hash_rates"
+
+@worker_ready.connect
+def record_hash_rates(**kwargs):
+    rates = measure_rates()
+    redis_client.hset(HASH_RATES_KEY, mapping=rates)
+    print("⏱ Hash rates: " + ", ".join(f"{name}={rate:,.0f}/s" for name, rate in rates.items()))
+
+def load_hash_rates() -> dict:
+    return {name.decode(): float(rate)
+            for name, rate in redis_client.hgetall(HASH_RATES_KEY).items()}
+
+
+# Бюджет пользователя: оценки (сек) его незавершённых задач по task id.
+# Запись снимается, когда задача закончилась. Если воркер упал и запись
+# осталась, её уберёт истечение ключа — он живёт user_budget_seconds
+# с последней постановки задачи.
+def budget_key(user_id: int) -> str:
+    return f"bruteforce_budget_{user_id}"
+
+def user_load(user_id: int) -> float:
+    return sum(float(seconds) for seconds in redis_client.hvals(budget_key(user_id)))
+
+def reserve_budget(user_id: int, task_id: str, seconds: float):
+    redis_client.hset(budget_key(user_id), task_id, seconds)
+    redis_client.expire(budget_key(user_id), int(settings.user_budget_seconds))
+
+def release_budget(user_id: int, task_id: str):
+    redis_client.hdel(budget_key(user_id), task_id)
+
+def owns_task(user_id: int, task_id: str) -> bool:
+    # в бюджете лежат как раз незавершённые задачи пользователя
+    return bool(redis_client.hexists(budget_key(user_id), task_id))
+
+
+# Отмена: флаг по task id задачи (для разрезанного перебора — по id
+# координатора). Перебор проверяет его вместе с отчётом о прогрессе, то
+# есть раз в CHECK_EVERY кандидатов; ещё не начатая задача — при старте.
+# Отменённый перебор ничего не публикует и не пишет в кеши.
+def cancel_key(task_id: str) -> str:
+    return f"bruteforce_cancel_{task_id}"
+
+def request_cancel(task_id: str):
+    redis_client.set(cancel_key(task_id), 1, ex=settings.checkpoint_ttl)
+
+def is_cancelled(task_id: str) -> bool:
+    return bool(redis_client.exists(cancel_key(task_id)))
+
+
+# Точки продолжения: индекс следующего кандидата и уже потраченное время.
+# Celery при повторной доставке сохраняет task id, по нему и ищем.
+def checkpoint_key(task_id: str) -> str:
+    return f"bruteforce_checkpoint_{task_id}"
+
+def load_checkpoint(task_id: str) -> dict:
+    raw = redis_client.get(checkpoint_key(task_id))
+    return json.loads(raw) if raw else {"index": 0, "elapsed": 0.0}
+
+def save_checkpoint(task_id: str, index: int, elapsed: float):
+    redis_client.set(checkpoint_key(task_id),
+                     json.dumps({"index": index, "elapsed": elapsed}),
+                     ex=settings.checkpoint_ttl)
+
+def clear_checkpoint(task_id: str):
+    redis_client.delete(checkpoint_key(task_id))
+
+
+def resumable_search(task_id: str, keyspace: Keyspace, hash_type: str, target: bytes,
+                     start: int = 0, stop: int = None, should_stop=None):
+    """
+    search() по [start, stop), сохраняющий точку продолжения под task_id.
+    should_stop() опрашивается вместе с прогрессом; True прерывает перебор.
+    Возвращает (пароль в bytes или None, время начала по perf_counter).
+    """
+    checkpoint = load_checkpoint(task_id)
+    position = max(start, checkpoint["index"])
+    started = time.perf_counter() - checkpoint["elapsed"]
+    last_saved = time.perf_counter()
+
+    def on_progress(delta: int):
+        nonlocal position, last_saved
+        position += delta
+        now = time.perf_counter()
+        if now - last_saved >= settings.checkpoint_interval:
+            save_checkpoint(task_id, position, now - started)
+            last_saved = now
+        return should_stop is not None and should_stop()
+
+    found, _ = search(keyspace, hash_type, target, start=position, stop=stop,
+                      on_progress=on_progress)
+    clear_checkpoint(task_id)
+    return found, started
+
+
+# acks_late: сообщение подтверждается только после завершения, так что при
+# падении воркера задача вернётся в очередь и продолжит с точки продолжения
+@celery.task(bind=True, acks_late=True, reject_on_worker_lost=True)
 def bruteforce_task(self, user_id: int, target_hash: str,
-                    charset: str, max_len: int, hash_type: str = "md5"):
+                    charset: str, max_len: int, hash_type: str = "md5",
+                    min_len: int = None, mask: str = None):
 
-    print(f"🔧 Task {self.request.id} started for user {user_id}")
-    algo = getattr(hashlib, hash_type)
-    start = time.perf_counter()
+    if is_cancelled(self.request.id):
+        return ""
+    target = parse_target(hash_type, target_hash)
+    if load_checkpoint(self.request.id)["index"]:
+        print(f"🔁 Task {self.request.id} resumed for user {user_id}")
+    else:
+        print(f"🔧 Task {self.request.id} started for user {user_id}")
 
-    for length in range(1, max_len + 1):
-        for chars in itertools.product(charset, repeat=length):
-            guess = "".join(chars)
-            if algo(guess.encode()).hexdigest() == target_hash:
-                elapsed = str(timedelta(seconds=int(time.perf_counter() - start)))
-                print(f"✅ Found {guess} in {elapsed}")
-                publish_status(user_id, {
-                    "status": "COMPLETED",
-                    "task_id": self.request.id,
-                    "result": guess,
-                    "elapsed_time": elapsed,
-                })
-                return guess
+    keyspace = make_keyspace(charset, max_len, min_len, mask)
+    found, start = resumable_search(self.request.id, keyspace, hash_type, target,
+                                    should_stop=lambda: is_cancelled(self.request.id))
+    if is_cancelled(self.request.id):
+        print(f"🛑 Task {self.request.id} cancelled")
+        return ""
+    guess = found.decode() if found is not None else ""
+    return finish_search(user_id, self.request.id, target, guess,
+                         charset, max_len, hash_type, time.perf_counter() - start,
+                         min_len, mask)
+
+
+def covers_exhausted(min_len: int = None, mask: str = None) -> bool:
+    # кеш пустых переборов знает только charset с длинами 1..max_len
+    return not mask and (min_len or 1) <= 1
+
+
+def finish_search(user_id: int, task_id: str, target: bytes, guess: str,
+                  charset: str, max_len: int, hash_type: str, elapsed: float,
+                  min_len: int = None, mask: str = None):
+    """Запоминает итог перебора одного хеша и отправляет его пользователю."""
+    release_budget(user_id, task_id)
+    if guess:
+        result_cache.remember(hash_type, target.hex(), guess)
+        elapsed = str(timedelta(seconds=int(elapsed)))
+        print(f"✅ Found {guess} in {elapsed}")
+        publish_status(user_id, {
+            "status": "COMPLETED",
+            "task_id": task_id,
+            "result": guess,
+            "elapsed_time": elapsed,
+        })
+        return guess
 
     print("❌ Not found")
+    if covers_exhausted(min_len, mask):
+        exhausted_cache.remember(hash_type, target.hex(), charset, max_len)
     publish_status(user_id, {
         "status": "FAILED",
-        "task_id": self.request.id,
+        "task_id": task_id,
         "message": "Password not found",
     })
     return ""
+
+
+# ----- Перебор одного хеша на всех воркерах -----
+# Флаг "пароль найден" общий для всех кусков одной задачи: запущенные
+# куски видят его при очередном отчёте о прогрессе, а ещё не начатые —
+# сразу при старте, и завершаются пустым результатом.
+def found_key(job_id: str) -> str:
+    return f"bruteforce_found_{job_id}"
+
+def split_chunks(total: int):
+    """Режет [0, total) на куски не меньше chunk_size и не больше max_chunks штук."""
+    size = max(settings.bruteforce_chunk_size, -(-total // settings.bruteforce_max_chunks))
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+@celery.task(bind=True)
+def bruteforce_coordinator_task(self, user_id: int, target_hash: str,
+                                charset: str, max_len: int, hash_type: str = "md5",
+                                min_len: int = None, mask: str = None):
+    """
+    Делит пространство на куски и раздаёт их группой по всем воркерам;
+    итог собирает bruteforce_reduce_task. Задача заменяется аккордом,
+    так что её task id в итоге указывает на результат сборки.
+    """
+    if is_cancelled(self.request.id):
+        return ""
+    chunks = split_chunks(make_keyspace(charset, max_len, min_len, mask).total)
+    print(f"🔧 Task {self.request.id} started for user {user_id}, {len(chunks)} chunks")
+    # куски идут в очередь длинных задач (task_routes), но с приоритетом
+    # самой задачи — куски задачи поменьше обгоняют куски задачи побольше
+    priority = (self.request.delivery_info or {}).get("priority")
+    options = {} if priority is None else {"priority": priority}
+    header = group(
+        bruteforce_chunk_task.s(self.request.id, target_hash, charset, max_len,
+                                hash_type, start, stop, min_len, mask).set(**options)
+        for start, stop in chunks
+    )
+    body = bruteforce_reduce_task.s(user_id, self.request.id, target_hash, charset,
+                                    max_len, hash_type, time.time(), min_len, mask)
+    raise self.replace(chord(header, body))
+
+
+@celery.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def bruteforce_chunk_task(self, job_id: str, target_hash: str, charset: str,
+                          max_len: int, hash_type: str, start: int, stop: int,
+                          min_len: int = None, mask: str = None):
+    """Перебор одного куска [start, stop). Возвращает пароль или ""."""
+    def job_done():
+        # пароль нашёл соседний кусок или задачу отменили
+        return bool(redis_client.exists(found_key(job_id), cancel_key(job_id)))
+
+    if job_done():
+        return ""
+    keyspace = make_keyspace(charset, max_len, min_len, mask)
+    found, _ = resumable_search(self.request.id, keyspace, hash_type,
+                                parse_target(hash_type, target_hash), start, stop,
+                                should_stop=job_done)
+    if found is None:
+        return ""
+    redis_client.set(found_key(job_id), 1, ex=settings.checkpoint_ttl)
+    return found.decode()
+
+
+@celery.task
+def bruteforce_reduce_task(results: list, user_id: int, job_id: str, target_hash: str,
+                           charset: str, max_len: int, hash_type: str, started: float,
+                           min_len: int = None, mask: str = None):
+    """Тело аккорда: первый непустой результат кусков или "не найден"."""
+    redis_client.delete(found_key(job_id))
+    if is_cancelled(job_id):
+        print(f"🛑 Task {job_id} cancelled")
+        return ""
+    guess = next((r for r in results if r), "")
+    return finish_search(user_id, job_id, parse_target(hash_type, target_hash), guess,
+                         charset, max_len, hash_type, time.time() - started, min_len, mask)
+
+
+@celery.task(bind=True)
+def bruteforce_batch_task(self, user_id: int, target_hashes: list[str],
+                          charset: str, max_len: int, hash_type: str = "md5",
+                          min_len: int = None, mask: str = None):
+    """Один проход по пространству для всех target_hashes сразу."""
+    if is_cancelled(self.request.id):
+        return {}
+    print(f"🔧 Batch task {self.request.id} started for user {user_id}, "
+          f"{len(target_hashes)} hashes")
+    targets = {parse_target(hash_type, h): h for h in target_hashes}
+    start = time.perf_counter()
+
+    def on_hit(digest: bytes, password: bytes):
+        # каждую находку отправляем сразу, не дожидаясь конца прохода
+        elapsed = str(timedelta(seconds=int(time.perf_counter() - start)))
+        print(f"✅ Found {password.decode()} in {elapsed}")
+        result_cache.remember(hash_type, digest.hex(), password.decode())
+        publish_status(user_id, {
+            "status": "FOUND",
+            "task_id": self.request.id,
+            "hash": targets[digest],
+            "result": password.decode(),
+            "elapsed_time": elapsed,
+        })
+
+    hits, _ = search_many(make_keyspace(charset, max_len, min_len, mask), hash_type, targets,
+                          on_hit=on_hit,
+                          on_progress=lambda delta: is_cancelled(self.request.id))
+    results = {targets[digest]: password.decode() for digest, password in hits.items()}
+    if is_cancelled(self.request.id):
+        # найденное уже разослано и запомнено, ненайденное не перебрано до конца
+        print(f"🛑 Batch {self.request.id} cancelled")
+        return results
+    if covers_exhausted(min_len, mask):
+        for digest in targets.keys() - hits.keys():
+            exhausted_cache.remember(hash_type, digest.hex(), charset, max_len)
+
+    release_budget(user_id, self.request.id)
+    print(f"🏁 Batch done: {len(results)}/{len(targets)} found")
+    publish_status(user_id, {
+        "status": "COMPLETED",
+        "task_id": self.request.id,
+        "found": len(results),
+        "total": len(targets),
+    })
+    return results
@@ -5,7 +5,18 @@ settings = get_settings()
 
 # app/core/celery_app.py
 
+import math
+
 from celery import Celery
+from kombu import Queue
+
+# Короткие задачи и длинные живут в разных очередях, чтобы перебор на
+# часы не стоял перед задачами на секунды. Воркер без -Q слушает обе;
+# под короткие можно держать отдельный: worker -Q bruteforce_short
+SHORT_QUEUE = "bruteforce_short"
+LONG_QUEUE = "bruteforce_long"
+# Redis эмулирует приоритеты подочередями: 0 — самый высокий, 9 — самый низкий
+MAX_PRIORITY = 9
 
 celery = Celery(
     "bruteforce",
@@ -15,8 +26,37 @@ celery = Celery(
 
 celery.autodiscover_tasks(["app.celery"])
 
+
+def route_by_cost(estimated_seconds: float) -> dict:
+    """
+    Очередь и приоритет для задачи с такой оценкой длительности —
+    передаётся в apply_async. Приоритет растёт с логарифмом длительности:
+    секундные задачи обгоняют минутные даже внутри одной очереди.
+    """
+    queue = SHORT_QUEUE if estimated_seconds < settings.short_job_seconds else LONG_QUEUE
+    priority = min(MAX_PRIORITY, int(math.log2(estimated_seconds + 1)))
+    return {"queue": queue, "priority": priority}
+
+
 celery.conf.update(
     task_serializer="json",
     result_serializer="json",
     accept_content=["json"],
+    # задачи с acks_late висят неподтверждёнными всё время перебора —
+    # таймаут должен быть больше самой долгой задачи, иначе Redis
+    # отдаст её второму воркеру (тот, впрочем, продолжит с checkpoint)
+    broker_transport_options={
+        "visibility_timeout": settings.broker_visibility_timeout,
+        "priority_steps": list(range(MAX_PRIORITY + 1)),
+        "queue_order_strategy": "priority",
+    },
+    task_queues=[Queue(SHORT_QUEUE), Queue(LONG_QUEUE)],
+    task_default_queue=SHORT_QUEUE,
+    task_default_priority=MAX_PRIORITY // 2,
+    # куски разрезанного перебора — работа длинной задачи, сборка итога — мгновенная
+    task_routes={
+        "app.celery.tasks.bruteforce_chunk_task": {"queue": LONG_QUEUE},
+        "app.celery.tasks.bruteforce_reduce_task": {"queue": SHORT_QUEUE, "priority": 0},
+    },
+    worker_prefetch_multiplier=settings.worker_prefetch_multiplier,
 )
@@ -15,6 +15,31 @@ class Settings(BaseSettings):
     # ----- База данных -----
     db_url: str = f"sqlite+aiosqlite:///{BASE_DIR / 'app.db'}"
 
+    # ----- Брутфорс -----
+    # сколько взломанных хешей держать в памяти перед таблицей cracked_hashes
+    result_cache_size: int = 10000
+    # как часто (сек) долгий перебор сохраняет точку продолжения
+    checkpoint_interval: float = 30.0
+    # сколько хранить точку продолжения в Redis, если задача так и не завершилась
+    checkpoint_ttl: int = 7 * 24 * 3600
+    # через сколько сек неподтверждённая (acks_late) задача уходит другому воркеру
+    broker_visibility_timeout: int = 12 * 3600
+    # кусок пространства для одной подзадачи при раздаче по воркерам
+    bruteforce_chunk_size: int = 1 << 22
+    # больше кусков не режем — аккорд на миллионы подзадач дороже перебора
+    bruteforce_max_chunks: int = 1024
+    # сколько процессов воркеров в кластере делят один разрезанный перебор
+    worker_processes: int = 1
+    # задачи дольше этого (по оценке, в секундах) не принимаются
+    max_job_seconds: float = 3600
+    # сколько секунд перебора (по оценке) может висеть на одном пользователе
+    user_budget_seconds: float = 4 * 3600
+    # задачи короче этого (по оценке, в секундах) идут в очередь коротких
+    short_job_seconds: float = 10
+    # сколько сообщений воркер берёт наперёд на процесс; 1 — длинная
+    # задача не держит за собой в префетче короткие
+    worker_prefetch_multiplier: int = 1
+
     # ----- Celery / redislite -----
     redis_path: str = "memory://"
 
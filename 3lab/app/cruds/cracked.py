@@ -0,0 +1,23 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.cracked import CrackedHash
+
+
+async def get_cracked(db: AsyncSession, hash_type: str, digest: str) -> CrackedHash | None:
+    res = await db.execute(
+        select(CrackedHash).where(CrackedHash.hash_type == hash_type, CrackedHash.digest == digest)
+    )
+    return res.scalar_one_or_none()
+
+
+def save_cracked(db: Session, hash_type: str, digest: str, password: str) -> None:
+    # вызывается из Celery-воркера, поэтому синхронно; дубликаты игнорируются
+    db.execute(
+        insert(CrackedHash)
+        .values(hash_type=hash_type, digest=digest, password=password)
+        .on_conflict_do_nothing(index_elements=["hash_type", "digest"])
+    )
+    db.commit()
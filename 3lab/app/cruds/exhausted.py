@@ -0,0 +1,19 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.exhausted import ExhaustedSearch
+
+
+async def list_exhausted(db: AsyncSession, hash_type: str, digest: str) -> list[ExhaustedSearch]:
+    res = await db.execute(
+        select(ExhaustedSearch).where(ExhaustedSearch.hash_type == hash_type,
+                                      ExhaustedSearch.digest == digest)
+    )
+    return list(res.scalars())
+
+
+def add_exhausted(db: Session, hash_type: str, digest: str, charset: str, max_length: int) -> None:
+    # вызывается из Celery-воркера, поэтому синхронно
+    db.add(ExhaustedSearch(hash_type=hash_type, digest=digest, charset=charset, max_length=max_length))
+    db.commit()
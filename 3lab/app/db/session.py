@@ -1,4 +1,6 @@
+from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
 from app.core.settings import get_settings
 
 settings = get_settings()
@@ -13,3 +15,9 @@ AsyncSessionLocal = async_sessionmaker(
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+# Синхронный доступ к той же базе — для Celery-воркеров, у которых нет event loop
+sync_engine = create_engine(settings.db_url.replace("+aiosqlite", ""), echo=False)
+
+SyncSessionLocal = sessionmaker(bind=sync_engine, expire_on_commit=False)
@@ -0,0 +1,14 @@
+from sqlalchemy import String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class CrackedHash(Base):
+    __tablename__ = "cracked_hashes"
+    __table_args__ = (UniqueConstraint("hash_type", "digest"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    hash_type: Mapped[str] = mapped_column(String(32))
+    digest: Mapped[str] = mapped_column(String(128))  # hex, нижний регистр
+    password: Mapped[str] = mapped_column(String(255))
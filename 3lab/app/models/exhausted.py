@@ -0,0 +1,16 @@
+from sqlalchemy import Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ExhaustedSearch(Base):
+    """Пространство, перебранное целиком без результата."""
+    __tablename__ = "exhausted_searches"
+    __table_args__ = (Index("ix_exhausted_searches_type_digest", "hash_type", "digest"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    hash_type: Mapped[str] = mapped_column(String(32))
+    digest: Mapped[str] = mapped_column(String(128))  # hex, нижний регистр
+    charset: Mapped[str] = mapped_column(String(255))  # уникальные символы, отсортированы
+    max_length: Mapped[int]  # перебраны длины 1..max_length
@@ -0,0 +1,210 @@
+"""
+Горячий цикл брутфорса: хеширование кандидатов из Keyspace и сравнение
+с целью.
+
+Цель один раз переводится из hex в bytes, и кандидат сравнивается по
+.digest() — без построения hex-строки на каждую попытку.
+
+В режиме prefix_states перебор идёт по дереву префиксов: префикс
+скармливается hashlib один раз, а для каждого символа последней позиции
+делается .copy().update(символ). Состояния хранятся для всех уровней,
+так что при смене префикса пересчитываются только изменившиеся позиции.
+На коротких паролях весь кандидат помещается в один блок сжатия, и
+выигрыш идёт в основном от .copy() вместо создания объекта hashlib
+с нуля (~10-25% на md5/sha1/sha256, см. bench_hash.py); чем длиннее
+префикс, тем больше экономия на самом хешировании.
+
+Алгоритмы берутся из реестра HASH_BACKENDS: имя -> конструктор с
+интерфейсом hashlib (update, copy, digest, digest_size). Сторонние
+бэкенды регистрируются, только если их пакет установлен.
+measure_rates() меряет скорость перебора по каждому алгоритму — по ней
+оценивается длительность задачи.
+
+Намеренная копия 2lab/app/services/hash_engine.py (см. keyspace.py).
+"""
+import hashlib
+import time
+
+from app.services.keyspace import Keyspace
+
+# как часто (в кандидатах) вызывается on_progress
+CHECK_EVERY = 1 << 14
+# сколько кандидатов перебирает measure_rates на один алгоритм
+BENCH_CANDIDATES = 1 << 15
+
+HASH_BACKENDS = {
+    name: getattr(hashlib, name)
+    for name in ("md5", "sha1", "sha224", "sha256", "sha384", "sha512",
+                 "blake2b", "blake2s", "sha3_224", "sha3_256", "sha3_384", "sha3_512")
+}
+# гуессов в секунду на один процесс, заполняется measure_rates()
+HASH_RATES = {}
+
+
+def register_backend(name: str, constructor):
+    """Добавляет алгоритм в реестр (или заменяет его более быстрой реализацией)."""
+    HASH_BACKENDS[name] = constructor
+
+
+try:
+    from blake3 import blake3
+except ImportError:
+    pass
+else:
+    register_backend("blake3", blake3)
+
+
+def get_hash(hash_type: str):
+    """Конструктор хеша по имени алгоритма ("md5", "sha256", ...)."""
+    try:
+        return HASH_BACKENDS[hash_type]
+    except KeyError:
+        raise ValueError(f"Неизвестный алгоритм хеширования: {hash_type}; "
+                         f"доступны: {', '.join(sorted(HASH_BACKENDS))}") from None
+
+
+def check_hash_type(hash_type: str) -> str:
+    """Валидатор для схем запросов: имя алгоритма из реестра или ValueError."""
+    get_hash(hash_type)
+    return hash_type
+
+
+def estimate_seconds(hash_type: str, candidates: int, processes: int = 1,
+                     rates=None) -> float:
+    """
+    Оценка времени перебора candidates кандидатов на processes процессах.
+    Скорость берётся из rates, затем из HASH_RATES, а если алгоритм ещё не
+    мерили — меряется сейчас.
+    """
+    rate = (rates or {}).get(hash_type) or HASH_RATES.get(hash_type)
+    if not rate:
+        rate = measure_rates([hash_type])[hash_type]
+    return candidates / (rate * max(1, processes))
+
+
+def measure_rates(algorithms=None, candidates: int = BENCH_CANDIDATES):
+    """
+    Прогоняет search по candidates кандидатам для каждого алгоритма и
+    записывает в HASH_RATES скорость (кандидатов в секунду на процесс).
+    Цель — нулевой digest, так что пространство перебирается целиком.
+    """
+    keyspace = Keyspace("abcdefghijklmnopqrstuvwxyz0123456789", 8, 8)
+    for name in algorithms or HASH_BACKENDS:
+        target = bytes(get_hash(name)().digest_size)
+        started = time.perf_counter()
+        search(keyspace, name, target, stop=candidates)
+        HASH_RATES[name] = candidates / (time.perf_counter() - started)
+    return dict(HASH_RATES)
+
+
+def parse_target(hash_type: str, hex_digest: str) -> bytes:
+    """hex-строка хеша -> bytes; проверяет, что длина подходит алгоритму."""
+    try:
+        target = bytes.fromhex(hex_digest.strip())
+    except ValueError:
+        raise ValueError("Хеш должен быть hex-строкой")
+    if len(target) != get_hash(hash_type)().digest_size:
+        raise ValueError(f"Длина хеша не подходит для {hash_type}")
+    return target
+
+
+def search(keyspace, hash_type: str, target: bytes, start: int = 0, stop: int = None,
+           on_progress=None, check_every: int = CHECK_EVERY, prefix_states: bool = True):
+    """
+    Ищет кандидата с индексом из [start, stop), чей хеш равен target.
+    Возвращает (найденный пароль в bytes или None, сколько перебрано).
+    Параметры — как у search_many.
+    """
+    hits, processed = search_many(keyspace, hash_type, {target}, start, stop,
+                                  on_progress=on_progress, check_every=check_every,
+                                  prefix_states=prefix_states)
+    return hits.get(target), processed
+
+
+def search_many(keyspace, hash_type: str, targets, start: int = 0, stop: int = None,
+                on_hit=None, on_progress=None, check_every: int = CHECK_EVERY,
+                prefix_states: bool = True):
+    """
+    Один проход по [start, stop) для целого набора целей (digest в bytes).
+    Поиск заканчивается, когда найдены все цели или кончился диапазон.
+
+    on_hit(digest, password) вызывается сразу при каждой находке.
+    on_progress(delta) вызывается примерно раз в check_every кандидатов
+    с числом перебранных с прошлого вызова; если он вернул True, поиск
+    прекращается. В конце on_progress получает остаток.
+    prefix_states включает перебор с переиспользованием состояния хеша
+    для общего префикса (см. описание модуля).
+
+    Возвращает ({digest: пароль в bytes}, сколько перебрано).
+    """
+    pending = set(targets)
+    hits = {}
+    if not pending:
+        return hits, 0
+
+    new = get_hash(hash_type)
+    w = keyspace.width
+    states = []  # states[i] — хеш после первых i позиций текущего буфера
+    current = None
+    processed = 0
+    reported = 0
+
+    for buf, bounds, changed, first, last in keyspace.blocks(start, stop):
+        tail = bounds[-1]
+        length = len(bounds)
+        if buf is not current:
+            # новая длина: у последней позиции свой алфавит (для маски),
+            # а состояния префикса строятся заново
+            current = buf
+            symbols = keyspace.alphabets[length - 1]
+            # однобайтовые символы пишем в буфер как int — это дешевле среза
+            cells = [sym[0] for sym in symbols] if w == 1 else symbols
+            states = [new()] + [None] * (length - 1)
+            changed = 0
+        if prefix_states:
+            for pos in range(changed, length - 1):
+                state = states[pos].copy()
+                state.update(buf[bounds[pos]:bounds[pos + 1]])
+                states[pos + 1] = state
+
+            prefix = states[length - 1]
+            for i, sym in enumerate(symbols[first:last]):
+                state = prefix.copy()
+                state.update(sym)
+                digest = state.digest()
+                if digest in pending:
+                    _record_hit(hits, pending, on_hit, digest, bytes(buf[:tail]) + sym)
+                    if not pending:
+                        break
+        else:
+            for i, cell in enumerate(cells[first:last]):
+                if w == 1:
+                    buf[tail] = cell
+                else:
+                    buf[tail:] = cell
+                digest = new(buf).digest()
+                if digest in pending:
+                    _record_hit(hits, pending, on_hit, digest, bytes(buf))
+                    if not pending:
+                        break
+
+        if not pending:
+            processed += i + 1
+            break
+        processed += last - first
+        if on_progress is not None and processed - reported >= check_every:
+            stop_requested = on_progress(processed - reported)
+            reported = processed
+            if stop_requested:
+                break
+
+    if on_progress is not None and processed > reported:
+        on_progress(processed - reported)
+    return hits, processed
+
+
+def _record_hit(hits, pending, on_hit, digest, password):
+    hits[digest] = password
+    pending.discard(digest)
+    if on_hit is not None:
+        on_hit(digest, password)
@@ -0,0 +1,206 @@
+"""
+Пространство кандидатов для брутфорса и перебор по нему без лишних аллокаций.
+
+Кандидаты нумеруются так же, как их выдаёт itertools.product по длинам
+min_length..max_length, поэтому любой индекс можно декодировать
+(locate) и начать перебор прямо с него — на этом держатся шардирование
+и продолжение прерванной задачи.
+
+У каждой позиции свой алфавит: для обычного charset он один на все
+позиции, для маски в духе hashcat (?u?l?l?d) — свой у каждой. Индекс
+тогда — число со смешанным основанием: цифра позиции pos пробегает
+len(alphabets[pos]) значений. Кандидаты длины L берут первые L позиций
+маски, как --increment в hashcat.
+
+Повторы в алфавите позиции отбрасываются: charset "aabbc" перебирается
+как "abc", иначе одни и те же кандидаты хешировались бы по нескольку раз.
+normalize_charset может ещё и переставить символы по частоте в паролях,
+чтобы вероятные кандидаты шли раньше.
+
+Это намеренная копия 2lab/app/services/keyspace.py: лабораторные —
+отдельные приложения со своим пакетом app, и воркер Celery не должен
+зависеть от дерева 2lab. Оставлено только то, что нужно 3lab (без
+пакетного перебора на numpy); исправления общей части вносятся в обе копии.
+"""
+import string
+
+# встроенные наборы масок, как в hashcat
+MASK_CHARSETS = {
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "d": string.digits,
+    "h": "0123456789abcdef",
+    "H": "0123456789ABCDEF",
+    "s": " !\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~",
+}
+MASK_CHARSETS["a"] = MASK_CHARSETS["l"] + MASK_CHARSETS["u"] + MASK_CHARSETS["d"] + MASK_CHARSETS["s"]
+
+# символы от частых к редким — примерно по утёкшим базам паролей (RockYou)
+CHAR_FREQUENCY = ("ae1io2nrl0s3t9m8c4d5y7u6hbkgpjfvwzxq"
+                  "AEIONRLSMTCDYBHUKGPJFVWZXQ"
+                  "._!-@*#/$&+,?=%)(;'\":<>[]^`{|}~ \\")
+_FREQUENCY_RANK = {ch: rank for rank, ch in enumerate(CHAR_FREQUENCY)}
+CHARSET_ORDERS = ("given", "frequency")
+
+
+def normalize_charset(charset: str, order: str = "given") -> str:
+    """
+    Убирает повторы символов. order="given" сохраняет порядок из запроса,
+    "frequency" ставит частые в паролях символы первыми (остальные — после,
+    в исходном порядке).
+    """
+    if order not in CHARSET_ORDERS:
+        raise ValueError(f"Неизвестный порядок charset: {order}; "
+                         f"доступны: {', '.join(CHARSET_ORDERS)}")
+    charset = "".join(dict.fromkeys(charset))
+    if order == "frequency":
+        rare = len(_FREQUENCY_RANK)
+        charset = "".join(sorted(charset, key=lambda ch: _FREQUENCY_RANK.get(ch, rare)))
+    return charset
+
+
+def parse_mask(mask: str):
+    """
+    Маска -> алфавиты по позициям. ?l ?u ?d ?h ?H ?s ?a — наборы символов,
+    ?? — сам знак вопроса, любой другой символ стоит на своей позиции как есть.
+    """
+    alphabets = []
+    chars = iter(mask)
+    for ch in chars:
+        if ch != "?":
+            alphabets.append(ch)
+            continue
+        name = next(chars, "")
+        if name == "?":
+            alphabets.append("?")
+        elif name in MASK_CHARSETS:
+            alphabets.append(MASK_CHARSETS[name])
+        else:
+            raise ValueError(f"Неизвестный набор в маске: ?{name}")
+    if not alphabets:
+        raise ValueError("Маска пуста")
+    return alphabets
+
+
+def make_keyspace(charset: str, max_length: int, min_length: int = None, mask: str = None):
+    """
+    Keyspace по параметрам задачи: по маске, если она задана, иначе по
+    charset. Без min_length маска перебирается только полной длины,
+    а charset — с длины 1.
+    """
+    if mask:
+        return Keyspace.from_mask(mask, min_length)
+    return Keyspace(charset, max_length, min_length or 1)
+
+
+class Keyspace:
+    """
+    Все строки длины min_length..max_length, где символ на позиции pos
+    берётся из alphabets[pos].
+
+    Кандидат живёт в заранее выделенном bytearray, который меняется
+    "одометром": при переходе к следующему кандидату переписывается только
+    последняя позиция, а префикс — раз в размер её алфавита. Символы
+    кодируются в UTF-8 каждый сам по себе, так что в charset можно мешать
+    ширины (кириллица с цифрами): позиции тогда занимают в буфере разное
+    число байт.
+    """
+
+    def __init__(self, charset: str, max_length: int, min_length: int = 1):
+        self._init([charset] * max_length, min_length)
+
+    @classmethod
+    def from_mask(cls, mask: str, min_length: int = None):
+        """
+        Пространство по маске. min_length — с какой длины перебирать
+        префиксы маски; по умолчанию только полная длина.
+        """
+        alphabets = parse_mask(mask)
+        keyspace = cls.__new__(cls)
+        keyspace._init(alphabets, len(alphabets) if min_length is None else min_length)
+        return keyspace
+
+    def _init(self, alphabets, min_length: int):
+        self.alphabets = [[ch.encode() for ch in dict.fromkeys(alphabet)] for alphabet in alphabets]
+        widths = {len(sym) for alphabet in self.alphabets for sym in alphabet}
+        # общая ширина символа в байтах, None — если ширины разные
+        self.width = widths.pop() if len(widths) == 1 else (None if widths else 1)
+        self.radices = [len(alphabet) for alphabet in self.alphabets]
+        self.min_length = max(1, min_length)
+        self.max_length = len(alphabets)
+        # counts[L] — сколько строк длины L
+        self.counts = [1]
+        for radix in self.radices:
+            self.counts.append(self.counts[-1] * radix)
+        self.total = sum(self.counts[self.min_length:self.max_length + 1])
+
+    def locate(self, index: int):
+        """Индекс кандидата -> (длина, цифры по позициям)."""
+        if index < 0:
+            raise IndexError("index out of keyspace")
+        for length in range(self.min_length, self.max_length + 1):
+            count = self.counts[length]
+            if index < count:
+                digits = [0] * length
+                for pos in range(length - 1, -1, -1):
+                    index, digits[pos] = divmod(index, self.radices[pos])
+                return length, digits
+            index -= count
+        raise IndexError("index out of keyspace")
+
+    def blocks(self, start: int = 0, stop: int = None):
+        """
+        Идёт по [start, stop) блоками кандидатов с общим префиксом.
+
+        Выдаёт (buf, bounds, changed, first, last): в buf уже записан
+        префикс, bounds[pos] — смещение позиции pos в buf (bounds[-1] —
+        начало последней позиции, всё после него принадлежит ей), changed —
+        первая позиция префикса, изменившаяся с прошлого блока (0 для
+        нового буфера), а последняя позиция должна пробежать
+        alphabets[длина - 1][first:last]. buf и bounds переиспользуются
+        между блоками одной длины; хвост buf после bounds[-1] можно
+        переписывать символами любой ширины.
+        """
+        stop = self.total if stop is None else min(stop, self.total)
+        remaining = stop - start
+        if remaining <= 0:
+            return
+        alphabets, radices = self.alphabets, self.radices
+
+        length, digits = self.locate(start)
+        while True:
+            last = length - 1
+            buf = bytearray()
+            bounds = []
+            for pos, d in enumerate(digits):
+                bounds.append(len(buf))
+                buf += alphabets[pos][d]
+            changed = 0
+            while True:
+                first = digits[last]
+                count = min(radices[last] - first, remaining)
+                yield buf, bounds, changed, first, first + count
+                remaining -= count
+                if remaining <= 0:
+                    return
+
+                # перенос разряда в префиксе
+                pos = last - 1
+                while pos >= 0 and digits[pos] == radices[pos] - 1:
+                    digits[pos] = 0
+                    pos -= 1
+                if pos < 0:
+                    break
+                digits[pos] += 1
+                digits[last] = 0
+                # символы могут быть разной ширины — префикс с pos
+                # переписывается целиком (это раз в radices[last] кандидатов)
+                del buf[bounds[pos]:]
+                for p in range(pos, length):
+                    bounds[p] = len(buf)
+                    buf += alphabets[p][digits[p]]
+                changed = pos
+
+            # префикс переполнился — следующая длина
+            length += 1
+            digits = [0] * length
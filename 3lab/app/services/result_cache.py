@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import get_settings
+from app.cruds.cracked import get_cracked, save_cracked
+from app.cruds.exhausted import add_exhausted, list_exhausted
+from app.db.session import SyncSessionLocal
+
+
+class LRUCache:
+    """Простой LRU-словарь фиксированного размера."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key):
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class ResultCache:
+    """
+    Кеш уже взломанных хешей: таблица cracked_hashes, перед ней LRU в памяти.
+    Ключ — (алгоритм, digest в hex нижнего регистра). API читает кеш
+    асинхронно, Celery-воркеры пишут в таблицу синхронно.
+    """
+
+    def __init__(self, maxsize: int):
+        self._lru = LRUCache(maxsize)
+
+    async def lookup(self, db: AsyncSession, hash_type: str, digest: str) -> str | None:
+        key = (hash_type, digest)
+        password = self._lru.get(key)
+        if password is None:
+            cracked = await get_cracked(db, hash_type, digest)
+            if cracked is not None:
+                password = cracked.password
+                self._lru.put(key, password)
+        return password
+
+    def remember(self, hash_type: str, digest: str, password: str) -> None:
+        self._lru.put((hash_type, digest), password)
+        try:
+            with SyncSessionLocal() as db:
+                save_cracked(db, hash_type, digest, password)
+        except SQLAlchemyError as e:
+            # кеш — оптимизация, из-за него задача падать не должна
+            print(f"⚠️ Cannot save cracked hash to cache: {e}")
+
+
+class ExhaustedCache:
+    """
+    Кеш безрезультатных переборов. Полный перебор charset C до длины L
+    отвечает и на любой запрос с charset из подмножества C и длиной <= L.
+    """
+
+    @staticmethod
+    def normalize(charset: str) -> str:
+        return "".join(sorted(set(charset)))
+
+    async def covers(self, db: AsyncSession, hash_type: str, digest: str,
+                     charset: str, max_length: int) -> bool:
+        wanted = set(charset)
+        for searched in await list_exhausted(db, hash_type, digest):
+            if max_length <= searched.max_length and wanted <= set(searched.charset):
+                return True
+        return False
+
+    def remember(self, hash_type: str, digest: str, charset: str, max_length: int) -> None:
+        try:
+            with SyncSessionLocal() as db:
+                add_exhausted(db, hash_type, digest, self.normalize(charset), max_length)
+        except SQLAlchemyError as e:
+            print(f"⚠️ Cannot save exhausted search to cache: {e}")
+
+
+result_cache = ResultCache(get_settings().result_cache_size)
+exhausted_cache = ExhaustedCache()